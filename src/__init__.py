@@ -1,32 +1,51 @@
 """
 Research Agent - Document Processing Module
+
+Exports are imported on first access, so importing the package does not load
+LangChain, ChromaDB or the Gemini client until a class that needs them is used.
 """
 
-from .document_loader import DocumentLoader
-from .vector_store import VectorStore
-from .document_processor import DocumentProcessor
-from .rag_pipeline import RAGPipeline
-from .agents import (
-    BaseAgent,
-    ResearcherAgent,
-    ReviewerAgent,
-    SynthesizerAgent,
-    QuestionerAgent,
-    FormatterAgent
-)
-from .multi_agent_system import MultiAgentResearchSystem
-
-__all__ = [
-    'DocumentLoader',
-    'VectorStore',
-    'DocumentProcessor',
-    'RAGPipeline',
-    'BaseAgent',
-    'ResearcherAgent',
-    'ReviewerAgent',
-    'SynthesizerAgent',
-    'QuestionerAgent',
-    'FormatterAgent',
-    'MultiAgentResearchSystem'
-]
+from importlib import import_module
+
+# Exported name -> submodule defining it
+_EXPORTS = {
+    'DocumentLoader': '.document_loader',
+    'VectorStore': '.vector_store',
+    'CachedEmbeddings': '.embedding_cache',
+    'MicroBatchEmbeddings': '.embedding_cache',
+    'DocumentProcessor': '.document_processor',
+    'RAGPipeline': '.rag_pipeline',
+    'LLMResponseCache': '.llm_cache',
+    'SemanticLSHCache': '.semantic_cache',
+    'AgentResult': '.results',
+    'ResearcherResult': '.results',
+    'ReviewerResult': '.results',
+    'SynthesizerResult': '.results',
+    'QuestionerResult': '.results',
+    'FormatterResult': '.results',
+    'WorkflowStep': '.results',
+    'WorkflowResult': '.results',
+    'BaseAgent': '.agents',
+    'ResearcherAgent': '.agents',
+    'ReviewerAgent': '.agents',
+    'SynthesizerAgent': '.agents',
+    'QuestionerAgent': '.agents',
+    'FormatterAgent': '.agents',
+    'MultiAgentResearchSystem': '.multi_agent_system'
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    """Import an exported name from its submodule on first access."""
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
 
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -4,22 +4,48 @@ Each agent has a specialized role in the research analysis pipeline.
 """
 
 import os
+import re
+import asyncio
 import logging
-from typing import Dict, List, Optional
+from functools import lru_cache
+from itertools import islice
+from typing import AsyncIterator, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import PromptTemplate
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 
 # Handle both script execution and module import
 try:
     from .rag_pipeline import RAGPipeline
+    from .llm_cache import LLMResponseCache
+    from .llm_retry import RATE_LIMITER, retry_transient
+    from .results import (
+        AgentResult,
+        ResearcherResult,
+        ReviewerResult,
+        SynthesizerResult,
+        QuestionerResult,
+        FormatterResult,
+        WorkflowResult
+    )
 except ImportError:
     # For script execution
     import sys
     from pathlib import Path
     sys.path.append(str(Path(__file__).parent))
     from rag_pipeline import RAGPipeline
+    from llm_cache import LLMResponseCache
+    from llm_retry import RATE_LIMITER, retry_transient
+    from results import (
+        AgentResult,
+        ResearcherResult,
+        ReviewerResult,
+        SynthesizerResult,
+        QuestionerResult,
+        FormatterResult,
+        WorkflowResult
+    )
 
 load_dotenv()
 
@@ -30,16 +56,218 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=1)
+def _get_api_key() -> str:
+    """Read the Google API key once per process."""
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise ValueError("GOOGLE_API_KEY not found in environment variables")
+    return api_key
+
+
+@lru_cache(maxsize=4)
+def _get_llm(model: str) -> ChatGoogleGenerativeAI:
+    """
+    Get the shared LLM client for a model.
+    
+    All agents reuse one client (and its connection pool) and bind their own
+    temperature per call instead of each constructing a client. System messages
+    are sent as Gemini's native system instruction rather than merged into the
+    user turn. The client makes a single attempt per request; retries are left
+    to retry_transient (see llm_retry).
+    """
+    return ChatGoogleGenerativeAI(
+        model=model,
+        google_api_key=_get_api_key(),
+        max_retries=1
+    )
+
+
+async def _achain(first: Optional[BaseMessage], rest: AsyncIterator) -> AsyncIterator:
+    """Yield first (unless None), then the rest of a stream."""
+    if first is not None:
+        yield first
+    async for item in rest:
+        yield item
+
+
+# Keyword alternations for the synthesis extractors, matched against lowercased
+# lines: one compiled scan per line instead of a chain of substring tests
+_HYPOTHESIS_KEYWORDS_RE = re.compile(r'hypothesis|h[123]')
+_INSIGHT_KEYWORDS_RE = re.compile(r'insight|pattern|relationship')
+
+# Section boundaries for the critique extractor, matched against trimmed lines.
+# A section ends at any non-list line (heading, label, prose), or a line that is
+# only a bold or colon-terminated label (e.g. "**Weaknesses**", "2. Gaps:")
+_SECTION_END_RE = re.compile(
+    r'(?:[^\-*\d].*'
+    r'|(?:[-*]|\d+[.)])?\s*(?:\*\*[^*]{1,60}\*\*|[^*]{1,40}:)\s*:?)'
+)
+
+
+@lru_cache(maxsize=16)
+def _section_header_re(section: str) -> "re.Pattern":
+    """Pattern for a trimmed line that starts (after markdown decoration) with the section name."""
+    return re.compile(
+        r'(?:#{1,6}|[-*]|\d+[.)])?\s*\**\s*' + re.escape(section) + r'\b',
+        re.IGNORECASE
+    )
+
+
+class _Line(NamedTuple):
+    """A trimmed, non-empty line of LLM output."""
+    text: str
+    lower: str
+
+
+def _prepare_lines(text: str) -> List[_Line]:
+    """
+    Split LLM output into trimmed, non-empty lines with lowercased copies.
+    
+    Built once per response and shared by every extractor run on it.
+    """
+    return [_Line(stripped, stripped.lower()) for stripped in map(str.strip, text.split('\n')) if stripped]
+
+
+# Rough number of characters per Gemini token, used to size prompts without
+# a tokenizer round-trip
+_CHARS_PER_TOKEN = 4
+
+
+def _estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a string."""
+    return (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Shorten text to about `max_tokens`, preferring to end at a sentence or line break."""
+    limit = max_tokens * _CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    boundary = max(cut.rfind('. '), cut.rfind('\n'))
+    if boundary >= limit * 0.8:
+        cut = cut[:boundary + 1]
+    return cut.rstrip() + " ..."
+
+
+def _fit_sections(sections: Dict[str, str], budget: int) -> Dict[str, str]:
+    """
+    Shrink prompt sections so their estimated total stays within a token budget.
+    
+    Sections smaller than an equal share of the budget are kept whole; the rest
+    of the budget is split evenly between the larger sections, which are truncated.
+    
+    Args:
+        sections: Prompt sections by template variable name
+        budget: Maximum estimated tokens for all sections together
+        
+    Returns:
+        Sections with the same keys, truncated where needed
+    """
+    sizes = {name: _estimate_tokens(text) for name, text in sections.items()}
+    if sum(sizes.values()) <= budget:
+        return sections
+    
+    remaining = budget
+    pending = sorted(sizes, key=sizes.get)
+    while pending and sizes[pending[0]] <= remaining // len(pending):
+        remaining -= sizes[pending.pop(0)]
+    
+    fitted = dict(sections)
+    for name in pending:
+        fitted[name] = _truncate_to_tokens(sections[name], remaining // len(pending))
+    return fitted
+
+
+def _bulleted(items: Iterable) -> str:
+    """Format items as a "- item" list, one per line."""
+    return "\n".join(f"- {item}" for item in items)
+
+
+def _source_bullets(sources: List[Dict], limit: int) -> str:
+    """Format the first `limit` sources as a "- source (Page: n)" list."""
+    return "\n".join(
+        f"- {s.get('source', 'Unknown')} (Page: {s.get('page', 'N/A')})" for s in sources[:limit]
+    )
+
+
+def _is_list_item(line: _Line) -> bool:
+    """Whether a line is a bulleted ('-') or numbered item."""
+    return line.text[0] == '-' or line.text[0].isdigit()
+
+
+# Line extractors: name -> (predicate, maximum number of items kept)
+_EXTRACTORS: Dict[str, Tuple[Callable[[_Line], bool], int]] = {
+    "findings": (_is_list_item, 10),
+    "hypotheses": (
+        lambda line: len(line.text) > 20 and _HYPOTHESIS_KEYWORDS_RE.search(line.lower) is not None, 5
+    ),
+    "insights": (
+        lambda line: len(line.text) > 30 and _INSIGHT_KEYWORDS_RE.search(line.lower) is not None, 5
+    ),
+    "gaps": (lambda line: len(line.text) > 20 and 'gap' in line.lower, 5),
+    "questions": (lambda line: len(line.text) > 10 and '?' in line.text, 7),
+}
+
+
+def _extract_all(lines: List[_Line], names: Iterable[str]) -> Dict[str, List[str]]:
+    """
+    Run several extractors over the response lines in a single pass.
+    
+    Args:
+        lines: Prepared lines of an LLM response
+        names: Extractors to run (keys of _EXTRACTORS)
+        
+    Returns:
+        Dictionary mapping each extractor name to its matching lines, in order
+    """
+    extracted = {name: [] for name in names}
+    pending = {name: _EXTRACTORS[name] for name in extracted}
+    for line in lines:
+        for name, (matches, limit) in list(pending.items()):
+            if matches(line):
+                items = extracted[name]
+                items.append(line.text)
+                if len(items) == limit:
+                    del pending[name]
+        # Stop scanning once every extractor has reached its limit
+        if not pending:
+            break
+    return extracted
+
+
 class BaseAgent:
     """Base class for all research agents."""
     
+    # Retrieval that only depends on the research query, so the orchestrator
+    # can run it before the agent's input is ready
+    CONTEXT_QUERY: Optional[str] = None
+    CONTEXT_K: int = 6
+    
+    # Upper bound (estimated tokens) for the variable-length sections of a prompt
+    PROMPT_TOKEN_BUDGET: int = 8000
+    
+    # Gemini model used by every agent
+    MODEL: str = "gemini-2.5-flash"
+    
+    # Shown by the orchestrator while the agent runs
+    PROGRESS_MESSAGE: str = "Working..."
+    
+    # Prompts are built once per class; subclasses override these
+    SYSTEM_PROMPT: str = ""
+    _SYSTEM_MESSAGE: Optional[SystemMessage] = None
+    USER_PROMPT: Optional[PromptTemplate] = None
+    
     def __init__(
         self,
         name: str,
         role: str,
-        rag_pipeline: RAGPipeline,
+        rag_pipeline: Optional[RAGPipeline],
         temperature: float = 0.3,
-        max_retrieval_docs: int = 8
+        max_retrieval_docs: int = 8,
+        response_cache: Optional[LLMResponseCache] = None,
+        context_cache: Optional[Dict[Tuple[str, int], Dict]] = None
     ):
         """
         Initialize the base agent.
@@ -47,28 +275,25 @@ class BaseAgent:
         Args:
             name: Agent name
             role: Agent's role description
-            rag_pipeline: RAG pipeline for document retrieval
+            rag_pipeline: RAG pipeline for document retrieval (None for agents that never retrieve)
             temperature: LLM temperature (lower for more focused, accurate responses)
             max_retrieval_docs: Maximum documents to retrieve
+            response_cache: Cache for LLM responses, usually shared by all agents (optional)
+            context_cache: Retrieval results keyed by context_cache_key(query, k), usually shared by all agents (optional)
         """
         self.name = name
         self.role = role
         self.rag_pipeline = rag_pipeline
         self.temperature = temperature
         self.max_retrieval_docs = max_retrieval_docs
+        self.response_cache = response_cache
+        self._ctx_cache = context_cache if context_cache is not None else {}
         
-        # Check for API key
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
-            raise ValueError("GOOGLE_API_KEY not found in environment variables")
-        
-        # Initialize LLM with lower temperature for accuracy
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            google_api_key=api_key,
-            temperature=temperature,
-            convert_system_message_to_human=True
-        )
+        # Shared LLM client with this agent's temperature bound to every call
+        # (lower temperature for accuracy)
+        self.llm = _get_llm(self.MODEL).bind(generation_config={"temperature": temperature})
+        # Cache key component: responses depend on the model and its temperature
+        self._llm_id = f"{self.MODEL}\x1f{temperature}"
         
         logger.info(f"Initialized {self.name} agent (temperature={temperature})")
     
@@ -83,70 +308,244 @@ class BaseAgent:
         Returns:
             Dictionary with context and sources
         """
+        if self.rag_pipeline is None:
+            raise ValueError(f"{self.name} agent has no RAG pipeline to retrieve from")
         if k is None:
             k = self.max_retrieval_docs
         
-        result = self.rag_pipeline.answer_question(query, k=k, return_sources=True)
+        # Identical (query, k) retrievals are answered once; failures are not cached
+        key = self.context_cache_key(query, k)
+        result = self._ctx_cache.get(key)
+        if result is None:
+            result = self.rag_pipeline.answer_question(query, k=k, return_sources=True)
+            if 'error' not in result:
+                self._ctx_cache[key] = result
         return result
     
-    def process(self, input_data: Dict, query: str) -> Dict:
+    @staticmethod
+    def context_cache_key(query: str, k: int) -> Tuple[str, int]:
+        """Context cache key; queries differing only in case or whitespace share an entry."""
+        return " ".join(query.lower().split()), k
+    
+    async def _agenerate(
+        self,
+        user_prompt: str,
+        on_token: Optional[Callable[[str], None]] = None
+    ) -> Tuple[str, List[_Line]]:
         """
-        Process input data and generate output.
-        Must be implemented by subclass.
+        Stream an LLM response, serving repeated or paraphrased prompts from the cache.
+        
+        Completed lines are prepared for the extractors while later tokens are
+        still being generated, so extraction overlaps with decoding.
         
         Args:
-            input_data: Input from previous agent
-            query: Original research query
+            user_prompt: Task prompt with context (sent after the agent's system prompt)
+            on_token: Called with each chunk of the response as it is generated
+                      (once with the whole response on a cache hit)
             
         Returns:
-            Dictionary with agent's output
+            Tuple of (response text, prepared lines of the response)
         """
-        raise NotImplementedError("Subclass must implement process method")
-
-
-class ResearcherAgent(BaseAgent):
-    """Agent that analyzes research papers and extracts key findings."""
+        if self.response_cache is not None:
+            cached = await self.response_cache.aget(self.SYSTEM_PROMPT, user_prompt, self._llm_id)
+            if cached is not None:
+                logger.info(f"{self.name}: Using cached response")
+                if on_token is not None:
+                    on_token(cached)
+                return cached, _prepare_lines(cached)
+        
+        try:
+            content, lines = await self._astream(user_prompt, on_token)
+        except BaseException:
+            # Nothing will be stored for this prompt (including on cancellation)
+            if self.response_cache is not None:
+                self.response_cache.discard(self.SYSTEM_PROMPT, user_prompt, self._llm_id)
+            raise
+        
+        if self.response_cache is not None:
+            await self.response_cache.aput(self.SYSTEM_PROMPT, user_prompt, content, self._llm_id)
+        return content, lines
     
-    def __init__(self, rag_pipeline: RAGPipeline, temperature: float = 0.2):
-        super().__init__(
-            name="RESEARCHER",
-            role="Analyzes research papers, extracts key findings, methodologies, and conclusions",
-            rag_pipeline=rag_pipeline,
-            temperature=temperature,
-            max_retrieval_docs=10
-        )
+    @retry_transient
+    async def _aopen_stream(self, user_prompt: str) -> Tuple[AsyncIterator, Optional[BaseMessage]]:
+        """
+        Send one LLM request within the request quota and wait for its first chunk.
+        
+        Rate-limit and availability errors are retried with randomized exponential
+        backoff (see llm_retry). Only this part of a generation is retried: once
+        chunks have been passed to on_token, restarting would repeat them.
+        
+        Args:
+            user_prompt: Task prompt with context
+            
+        Returns:
+            Tuple of (stream of the remaining chunks, first chunk or None if the
+            response is empty)
+        """
+        await RATE_LIMITER.acquire()
+        
+        messages = [
+            self._SYSTEM_MESSAGE,
+            HumanMessage(content=user_prompt)
+        ]
+        stream = self.llm.astream(messages)
+        return stream, await anext(stream, None)
     
-    def process(self, input_data: Dict, query: str) -> Dict:
+    async def _astream(
+        self,
+        user_prompt: str,
+        on_token: Optional[Callable[[str], None]] = None
+    ) -> Tuple[str, List[_Line]]:
         """
-        Analyze papers and extract key findings.
+        Stream one LLM response, preparing its lines while it is decoded.
         
         Args:
-            input_data: Initial query or research topic
-            query: Research query/topic
+            user_prompt: Task prompt with context
+            on_token: Called with each chunk of the response as it is generated
             
         Returns:
-            Dictionary with analysis findings
+            Tuple of (response text, prepared lines of the response)
         """
-        logger.info(f"{self.name}: Starting analysis of research papers...")
+        stream, first = await self._aopen_stream(user_prompt)
         
-        # Retrieve relevant documents
-        retrieval_query = query if isinstance(input_data, str) else input_data.get('query', query)
-        context_result = self.retrieve_context(retrieval_query, k=10)
+        chunks = []
+        lines = []
+        pending = ""
+        prompt_tokens = cached_tokens = 0
+        async for chunk in _achain(first, stream):
+            text = chunk.content
+            if on_token is not None:
+                on_token(text)
+            chunks.append(text)
+            pending += text
+            if '\n' in text:
+                complete, _, pending = pending.rpartition('\n')
+                lines.extend(_prepare_lines(complete))
+            usage = getattr(chunk, 'usage_metadata', None)
+            if usage:
+                prompt_tokens = max(prompt_tokens, usage.get('input_tokens', 0))
+                cached_tokens = max(cached_tokens, (usage.get('input_token_details') or {}).get('cache_read', 0))
+        lines.extend(_prepare_lines(pending))
         
-        if not context_result.get('sources'):
-            return {
-                "agent": self.name,
-                "status": "error",
-                "message": "No relevant documents found",
-                "findings": [],
-                "sources": []
-            }
+        if prompt_tokens:
+            # Gemini reuses repeated prompt prefixes implicitly; cached tokens are billed at a discount
+            logger.info(f"{self.name}: {prompt_tokens} prompt tokens ({cached_tokens} from Gemini's implicit cache)")
+        return ''.join(chunks), lines
+    
+    async def aretrieve_context(self, query: str, k: Optional[int] = None) -> Dict:
+        """
+        Retrieve context without blocking the event loop.
         
-        # Create analysis prompt
-        context_text = context_result['answer']
-        sources = context_result.get('sources', [])
+        The RAG pipeline is synchronous, so retrieval runs in a worker thread
+        and can overlap with LLM calls made by other agents.
+        """
+        return await asyncio.to_thread(self.retrieve_context, query, k)
+    
+    def context_query(self, query: str) -> Optional[str]:
+        """
+        Build this agent's retrieval query for a research query.
+        
+        Args:
+            query: Original research query
+            
+        Returns:
+            Retrieval query, or None if the agent does not retrieve
+        """
+        if self.CONTEXT_QUERY is None:
+            return None
+        return self.CONTEXT_QUERY.format(query=query)
+    
+    def context_keywords(self) -> List[str]:
+        """Keywords this agent adds to the research query when retrieving."""
+        if self.CONTEXT_QUERY is None:
+            return []
+        return self.CONTEXT_QUERY.replace("{query}", "").lower().split()
+    
+    def select_shared_context(self, shared_context: Dict) -> Dict:
+        """
+        Narrow a retrieval shared by several agents down to this agent.
+        
+        The shared answer is kept, and the retrieved passages are reranked by how
+        many of this agent's keywords they mention (ties keep retrieval order);
+        the top CONTEXT_K become this agent's sources.
+        
+        Args:
+            shared_context: Result of the fused retrieval (answer_question format)
+            
+        Returns:
+            Dictionary with context and sources for this agent
+        """
+        keywords = self.context_keywords()
+        sources = sorted(
+            shared_context.get('sources', []),
+            key=lambda source: -sum(keyword in source.get('content_preview', '').lower() for keyword in keywords)
+        )[:self.CONTEXT_K]
+        return {**shared_context, "sources": sources, "num_sources": len(sources)}
+    
+    async def aprefetch_context(self, query: str) -> Dict:
+        """
+        Run this agent's retrieval ahead of aprocess.
+        
+        Args:
+            query: Original research query
+            
+        Returns:
+            Dictionary with context and sources (empty if the agent does not retrieve)
+        """
+        context_query = self.context_query(query)
+        if context_query is None:
+            return {}
+        return await self.aretrieve_context(context_query, k=self.CONTEXT_K)
+    
+    def process(self, input_data: Union[Dict, AgentResult], query: str) -> AgentResult:
+        """
+        Synchronous entry point; runs aprocess to completion.
+        
+        Args:
+            input_data: Input from previous agent
+            query: Original research query
+            
+        Returns:
+            Agent's output
+        """
+        return asyncio.run(self.aprocess(input_data, query))
+    
+    def describe_result(self, result: AgentResult) -> str:
+        """One-line summary of a successful result, for progress output."""
+        return "Done"
+    
+    async def aprocess(
+        self,
+        input_data: Union[Dict, AgentResult],
+        query: str,
+        context_result: Optional[Dict] = None,
+        on_token: Optional[Callable[[str], None]] = None
+    ) -> AgentResult:
+        """
+        Process input data and generate output.
+        Must be implemented by subclass.
         
-        system_prompt = """You are a meticulous research analyst. Your task is to analyze research papers and extract key findings, methodologies, and conclusions.
+        Args:
+            input_data: Input from previous agent
+            query: Original research query
+            context_result: Prefetched auxiliary retrieval (retrieved on demand if None)
+            on_token: Called with each chunk of the response as it is generated (optional)
+            
+        Returns:
+            Agent's output
+        """
+        raise NotImplementedError("Subclass must implement aprocess method")
+
+
+class ResearcherAgent(BaseAgent):
+    """Agent that analyzes research papers and extracts key findings."""
+    
+    PROGRESS_MESSAGE = "Analyzing research papers..."
+    
+    CONTEXT_QUERY = "{query}"
+    CONTEXT_K = 10
+    
+    SYSTEM_PROMPT = """You are a meticulous research analyst. Your task is to analyze research papers and extract key findings, methodologies, and conclusions.
 
 CRITICAL RULES:
 1. ONLY use information from the provided context - DO NOT hallucinate or invent facts
@@ -162,14 +561,17 @@ Format your analysis clearly with sections for:
 - Conclusions
 - Limitations
 """
-        
-        user_prompt = f"""Analyze the following research papers related to: {query}
+    _SYSTEM_MESSAGE = SystemMessage(content=SYSTEM_PROMPT)
+    
+    USER_PROMPT = PromptTemplate(
+        input_variables=["query", "context_text", "source_list"],
+        template="""Analyze the following research papers related to: {query}
 
 CONTEXT FROM DOCUMENTS:
 {context_text}
 
 SOURCES:
-{chr(10).join([f"- {s.get('source', 'Unknown')} (Page: {s.get('page', 'N/A')})" for s in sources[:5]])}
+{source_list}
 
 Please provide a detailed analysis with:
 1. Key findings from the papers
@@ -178,85 +580,103 @@ Please provide a detailed analysis with:
 4. Any limitations or gaps mentioned
 
 Remember: Only use information from the provided context. Cite sources for each finding."""
-
-        try:
-            messages = [
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=user_prompt)
-            ]
-            response = self.llm.invoke(messages)
-            analysis = response.content if hasattr(response, 'content') else str(response)
-            
-            logger.info(f"{self.name}: Analysis complete")
-            
-            return {
-                "agent": self.name,
-                "status": "success",
-                "analysis": analysis,
-                "findings": self._extract_findings(analysis),
-                "sources": sources,
-                "num_sources": len(sources)
-            }
-        except Exception as e:
-            logger.error(f"{self.name} error: {str(e)}")
-            return {
-                "agent": self.name,
-                "status": "error",
-                "message": str(e),
-                "findings": [],
-                "sources": []
-            }
-    
-    def _extract_findings(self, analysis: str) -> List[str]:
-        """Extract key findings from analysis text."""
-        # Simple extraction - can be enhanced
-        lines = analysis.split('\n')
-        findings = [line.strip() for line in lines if line.strip() and (line.strip().startswith('-') or line.strip()[0].isdigit())]
-        return findings[:10]  # Return top 10 findings
-
-
-class ReviewerAgent(BaseAgent):
-    """Agent that critiques findings and identifies strengths/weaknesses."""
+    )
     
-    def __init__(self, rag_pipeline: RAGPipeline, temperature: float = 0.3):
+    def __init__(
+        self,
+        rag_pipeline: RAGPipeline,
+        temperature: float = 0.2,
+        response_cache: Optional[LLMResponseCache] = None,
+        context_cache: Optional[Dict[Tuple[str, int], Dict]] = None
+    ):
         super().__init__(
-            name="REVIEWER",
-            role="Critiques research findings, identifies strengths, weaknesses, and potential biases",
+            name="RESEARCHER",
+            role="Analyzes research papers, extracts key findings, methodologies, and conclusions",
             rag_pipeline=rag_pipeline,
             temperature=temperature,
-            max_retrieval_docs=8
+            max_retrieval_docs=10,
+            response_cache=response_cache,
+            context_cache=context_cache
         )
     
-    def process(self, input_data: Dict, query: str) -> Dict:
+    def describe_result(self, result: ResearcherResult) -> str:
+        """Number of sources analyzed."""
+        return f"Found {result.num_sources} sources"
+    
+    async def aprocess(
+        self,
+        input_data: Dict,
+        query: str,
+        context_result: Optional[Dict] = None,
+        on_token: Optional[Callable[[str], None]] = None
+    ) -> ResearcherResult:
         """
-        Critique the researcher's findings.
+        Analyze papers and extract key findings.
         
         Args:
-            input_data: Output from ResearcherAgent
-            query: Original research query
+            input_data: Initial query or research topic
+            query: Research query/topic
+            context_result: Prefetched retrieval for the research query (retrieved on demand if None)
+            on_token: Called with each chunk of the response as it is generated (optional)
             
         Returns:
-            Dictionary with critique
+            ResearcherResult with the analysis and findings
         """
-        logger.info(f"{self.name}: Starting critique of findings...")
+        logger.info(f"{self.name}: Starting analysis of research papers...")
         
-        if input_data.get('status') != 'success':
-            return {
-                "agent": self.name,
-                "status": "error",
-                "message": "Invalid input from previous agent",
-                "critique": ""
-            }
+        # Retrieve relevant documents
+        if context_result is None:
+            retrieval_query = query if isinstance(input_data, str) else input_data.get('query', query)
+            context_result = await self.aretrieve_context(retrieval_query, k=self.CONTEXT_K)
         
-        researcher_analysis = input_data.get('analysis', '')
-        findings = input_data.get('findings', [])
-        sources = input_data.get('sources', [])
+        if not context_result.get('sources'):
+            return ResearcherResult(
+                agent=self.name,
+                status="error",
+                message="No relevant documents found"
+            )
         
-        # Retrieve additional context for critique
-        critique_query = f"methodology limitations weaknesses {query}"
-        context_result = self.retrieve_context(critique_query, k=6)
+        # Create analysis prompt
+        context_text = context_result['answer']
+        sources = context_result.get('sources', [])
         
-        system_prompt = """You are a critical research reviewer. Your task is to evaluate research findings, identify strengths, weaknesses, and potential biases.
+        sections = _fit_sections(
+            {"context_text": context_text},
+            self.PROMPT_TOKEN_BUDGET
+        )
+        user_prompt = self.USER_PROMPT.format(
+            query=query,
+            source_list=_source_bullets(sources, 5),
+            **sections
+        )
+
+        try:
+            analysis, lines = await self._agenerate(user_prompt, on_token)
+            
+            logger.info(f"{self.name}: Analysis complete")
+            
+            return ResearcherResult(
+                agent=self.name,
+                status="success",
+                analysis=analysis,
+                findings=_extract_all(lines, ["findings"])["findings"],
+                sources=sources,
+                num_sources=len(sources)
+            )
+        except Exception as e:
+            logger.error(f"{self.name} error: {str(e)}")
+            return ResearcherResult(agent=self.name, status="error", message=str(e))
+
+
+class ReviewerAgent(BaseAgent):
+    """Agent that critiques findings and identifies strengths/weaknesses."""
+    
+    PROGRESS_MESSAGE = "Critiquing findings..."
+    
+    CONTEXT_QUERY = "methodology limitations weaknesses {query}"
+    CONTEXT_K = 6
+    
+    SYSTEM_PROMPT = """You are a critical research reviewer. Your task is to evaluate research findings, identify strengths, weaknesses, and potential biases.
 
 CRITICAL RULES:
 1. Base your critique ONLY on the provided context and findings
@@ -273,17 +693,20 @@ Format your critique with:
 - Potential Biases
 - Gaps or Missing Information
 """
-        
-        user_prompt = f"""Review and critique the following research analysis related to: {query}
+    _SYSTEM_MESSAGE = SystemMessage(content=SYSTEM_PROMPT)
+    
+    USER_PROMPT = PromptTemplate(
+        input_variables=["query", "researcher_analysis", "finding_list", "additional_context"],
+        template="""Review and critique the following research analysis related to: {query}
 
 RESEARCHER'S ANALYSIS:
 {researcher_analysis}
 
 KEY FINDINGS:
-{chr(10).join([f"- {f}" for f in findings[:10]])}
+{finding_list}
 
 ADDITIONAL CONTEXT:
-{context_result.get('answer', 'No additional context available')}
+{additional_context}
 
 Please provide a thorough critique focusing on:
 1. Strengths of the research and analysis
@@ -293,95 +716,123 @@ Please provide a thorough critique focusing on:
 5. Consistency and logical coherence
 
 Remember: Base your critique on the actual content. Do not invent criticisms."""
-
-        try:
-            messages = [
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=user_prompt)
-            ]
-            response = self.llm.invoke(messages)
-            critique = response.content if hasattr(response, 'content') else str(response)
-            
-            logger.info(f"{self.name}: Critique complete")
-            
-            return {
-                "agent": self.name,
-                "status": "success",
-                "critique": critique,
-                "researcher_analysis": researcher_analysis,
-                "strengths": self._extract_section(critique, "strengths"),
-                "weaknesses": self._extract_section(critique, "weaknesses"),
-                "sources": sources + context_result.get('sources', [])
-            }
-        except Exception as e:
-            logger.error(f"{self.name} error: {str(e)}")
-            return {
-                "agent": self.name,
-                "status": "error",
-                "message": str(e),
-                "critique": ""
-            }
-    
-    def _extract_section(self, text: str, section: str) -> List[str]:
-        """Extract a specific section from critique text."""
-        lines = text.split('\n')
-        section_lines = []
-        in_section = False
-        for line in lines:
-            if section.lower() in line.lower() and ('-' in line or line[0].isdigit() if line.strip() else False):
-                in_section = True
-            if in_section:
-                if line.strip() and (line.strip().startswith('-') or (line.strip() and line.strip()[0].isdigit())):
-                    section_lines.append(line.strip())
-                elif line.strip() and not line.strip()[0].isdigit() and '-' not in line and len(line.strip()) > 50:
-                    break
-        return section_lines[:5]
-
-
-class SynthesizerAgent(BaseAgent):
-    """Agent that synthesizes insights and generates hypotheses."""
+    )
     
-    def __init__(self, rag_pipeline: RAGPipeline, temperature: float = 0.4):
+    def __init__(
+        self,
+        rag_pipeline: RAGPipeline,
+        temperature: float = 0.3,
+        response_cache: Optional[LLMResponseCache] = None,
+        context_cache: Optional[Dict[Tuple[str, int], Dict]] = None
+    ):
         super().__init__(
-            name="SYNTHESIZER",
-            role="Synthesizes findings and critiques to generate new insights and testable hypotheses",
+            name="REVIEWER",
+            role="Critiques research findings, identifies strengths, weaknesses, and potential biases",
             rag_pipeline=rag_pipeline,
             temperature=temperature,
-            max_retrieval_docs=8
+            max_retrieval_docs=8,
+            response_cache=response_cache,
+            context_cache=context_cache
         )
     
-    def process(self, input_data: Dict, query: str) -> Dict:
+    def describe_result(self, result: ReviewerResult) -> str:
+        """Critique completion notice."""
+        return "Critique complete"
+    
+    async def aprocess(
+        self,
+        input_data: ResearcherResult,
+        query: str,
+        context_result: Optional[Dict] = None,
+        on_token: Optional[Callable[[str], None]] = None
+    ) -> ReviewerResult:
         """
-        Synthesize findings and generate hypotheses.
+        Critique the researcher's findings.
         
         Args:
-            input_data: Output from ReviewerAgent
+            input_data: Output from ResearcherAgent
             query: Original research query
+            context_result: Prefetched auxiliary retrieval (retrieved on demand if None)
+            on_token: Called with each chunk of the response as it is generated (optional)
             
         Returns:
-            Dictionary with synthesis and hypotheses
+            ReviewerResult with the critique
         """
-        logger.info(f"{self.name}: Starting synthesis...")
+        logger.info(f"{self.name}: Starting critique of findings...")
         
-        if input_data.get('status') != 'success':
-            return {
-                "agent": self.name,
-                "status": "error",
-                "message": "Invalid input from previous agent",
-                "synthesis": "",
-                "hypotheses": []
-            }
+        if input_data.status != 'success':
+            return ReviewerResult(
+                agent=self.name,
+                status="error",
+                message="Invalid input from previous agent"
+            )
         
-        researcher_analysis = input_data.get('researcher_analysis', '')
-        critique = input_data.get('critique', '')
-        strengths = input_data.get('strengths', [])
-        weaknesses = input_data.get('weaknesses', [])
+        researcher_analysis = input_data.analysis
+        findings = input_data.findings
+        sources = input_data.sources
         
-        # Retrieve context for synthesis
-        synthesis_query = f"hypotheses research questions future work {query}"
-        context_result = self.retrieve_context(synthesis_query, k=6)
+        # Retrieve additional context for critique
+        if context_result is None:
+            context_result = await self.aprefetch_context(query)
         
-        system_prompt = """You are a research synthesizer. Your task is to combine findings and critiques to generate new insights and testable hypotheses.
+        sections = _fit_sections(
+            {
+                "researcher_analysis": researcher_analysis,
+                "additional_context": context_result.get('answer', 'No additional context available')
+            },
+            self.PROMPT_TOKEN_BUDGET
+        )
+        user_prompt = self.USER_PROMPT.format(
+            query=query,
+            finding_list=_bulleted(findings[:10]),
+            **sections
+        )
+
+        try:
+            critique, lines = await self._agenerate(user_prompt, on_token)
+            
+            logger.info(f"{self.name}: Critique complete")
+            
+            return ReviewerResult(
+                agent=self.name,
+                status="success",
+                critique=critique,
+                researcher_analysis=researcher_analysis,
+                strengths=self._extract_section(lines, "strengths"),
+                weaknesses=self._extract_section(lines, "weaknesses"),
+                sources=sources + context_result.get('sources', [])
+            )
+        except Exception as e:
+            logger.error(f"{self.name} error: {str(e)}")
+            return ReviewerResult(agent=self.name, status="error", message=str(e))
+    
+    def _extract_section(self, lines: List[_Line], section: str) -> List[str]:
+        """Extract the list items under a specific section heading of the critique lines."""
+        header_re = _section_header_re(section)
+        start = next((i for i, line in enumerate(lines) if header_re.match(line.text)), None)
+        if start is None:
+            return []
+        section_lines = []
+        # The section runs until the next heading or prose line
+        for line in islice(lines, start + 1, None):
+            if _SECTION_END_RE.fullmatch(line.text):
+                break
+            if _is_list_item(line):
+                section_lines.append(line.text)
+                if len(section_lines) == 5:
+                    break
+        return section_lines
+
+
+class SynthesizerAgent(BaseAgent):
+    """Agent that synthesizes insights and generates hypotheses."""
+    
+    PROGRESS_MESSAGE = "Synthesizing insights and generating hypotheses..."
+    
+    CONTEXT_QUERY = "hypotheses research questions future work {query}"
+    CONTEXT_K = 6
+    
+    SYSTEM_PROMPT = """You are a research synthesizer. Your task is to combine findings and critiques to generate new insights and testable hypotheses.
 
 CRITICAL RULES:
 1. Base hypotheses ONLY on the provided findings and context
@@ -398,8 +849,11 @@ Format your synthesis with:
 - Testable Hypotheses
 - Research Directions
 """
-        
-        user_prompt = f"""Synthesize the following research analysis and critique related to: {query}
+    _SYSTEM_MESSAGE = SystemMessage(content=SYSTEM_PROMPT)
+    
+    USER_PROMPT = PromptTemplate(
+        input_variables=["query", "researcher_analysis", "critique", "strength_list", "weakness_list", "additional_context"],
+        template="""Synthesize the following research analysis and critique related to: {query}
 
 RESEARCHER'S FINDINGS:
 {researcher_analysis}
@@ -408,13 +862,13 @@ REVIEWER'S CRITIQUE:
 {critique}
 
 STRENGTHS IDENTIFIED:
-{chr(10).join([f"- {s}" for s in strengths[:5]])}
+{strength_list}
 
 WEAKNESSES IDENTIFIED:
-{chr(10).join([f"- {w}" for w in weaknesses[:5]])}
+{weakness_list}
 
 ADDITIONAL CONTEXT:
-{context_result.get('answer', 'No additional context available')}
+{additional_context}
 
 Please synthesize this information to:
 1. Identify key insights and patterns
@@ -424,102 +878,110 @@ Please synthesize this information to:
 5. Explain the evidence base for each hypothesis
 
 Remember: Hypotheses must be grounded in the actual findings. Be specific and testable."""
-
-        try:
-            messages = [
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=user_prompt)
-            ]
-            response = self.llm.invoke(messages)
-            synthesis = response.content if hasattr(response, 'content') else str(response)
-            
-            logger.info(f"{self.name}: Synthesis complete")
-            
-            return {
-                "agent": self.name,
-                "status": "success",
-                "synthesis": synthesis,
-                "hypotheses": self._extract_hypotheses(synthesis),
-                "insights": self._extract_insights(synthesis),
-                "researcher_analysis": researcher_analysis,
-                "critique": critique
-            }
-        except Exception as e:
-            logger.error(f"{self.name} error: {str(e)}")
-            return {
-                "agent": self.name,
-                "status": "error",
-                "message": str(e),
-                "synthesis": "",
-                "hypotheses": []
-            }
-    
-    def _extract_hypotheses(self, synthesis: str) -> List[str]:
-        """Extract hypotheses from synthesis text."""
-        hypotheses = []
-        lines = synthesis.split('\n')
-        for line in lines:
-            if 'hypothesis' in line.lower() or 'h1' in line.lower() or 'h2' in line.lower() or 'h3' in line.lower():
-                if line.strip() and len(line.strip()) > 20:
-                    hypotheses.append(line.strip())
-        return hypotheses[:5]
-    
-    def _extract_insights(self, synthesis: str) -> List[str]:
-        """Extract key insights from synthesis text."""
-        insights = []
-        lines = synthesis.split('\n')
-        for line in lines:
-            if ('insight' in line.lower() or 'pattern' in line.lower() or 'relationship' in line.lower()) and line.strip():
-                if len(line.strip()) > 30:
-                    insights.append(line.strip())
-        return insights[:5]
-
-
-class QuestionerAgent(BaseAgent):
-    """Agent that identifies gaps and generates follow-up questions."""
+    )
     
-    def __init__(self, rag_pipeline: RAGPipeline, temperature: float = 0.4):
+    def __init__(
+        self,
+        rag_pipeline: RAGPipeline,
+        temperature: float = 0.4,
+        response_cache: Optional[LLMResponseCache] = None,
+        context_cache: Optional[Dict[Tuple[str, int], Dict]] = None
+    ):
         super().__init__(
-            name="QUESTIONER",
-            role="Identifies research gaps and generates critical follow-up questions",
+            name="SYNTHESIZER",
+            role="Synthesizes findings and critiques to generate new insights and testable hypotheses",
             rag_pipeline=rag_pipeline,
             temperature=temperature,
-            max_retrieval_docs=6
+            max_retrieval_docs=8,
+            response_cache=response_cache,
+            context_cache=context_cache
         )
     
-    def process(self, input_data: Dict, query: str) -> Dict:
+    def describe_result(self, result: SynthesizerResult) -> str:
+        """Number of hypotheses generated."""
+        return f"Generated {len(result.hypotheses)} hypotheses"
+    
+    async def aprocess(
+        self,
+        input_data: ReviewerResult,
+        query: str,
+        context_result: Optional[Dict] = None,
+        on_token: Optional[Callable[[str], None]] = None
+    ) -> SynthesizerResult:
         """
-        Identify gaps and generate questions.
+        Synthesize findings and generate hypotheses.
         
         Args:
-            input_data: Output from SynthesizerAgent
+            input_data: Output from ReviewerAgent
             query: Original research query
+            context_result: Prefetched auxiliary retrieval (retrieved on demand if None)
+            on_token: Called with each chunk of the response as it is generated (optional)
             
         Returns:
-            Dictionary with gaps and questions
+            SynthesizerResult with the synthesis and hypotheses
         """
-        logger.info(f"{self.name}: Identifying gaps and generating questions...")
+        logger.info(f"{self.name}: Starting synthesis...")
         
-        if input_data.get('status') != 'success':
-            return {
-                "agent": self.name,
-                "status": "error",
-                "message": "Invalid input from previous agent",
-                "gaps": [],
-                "questions": []
-            }
-        
-        synthesis = input_data.get('synthesis', '')
-        hypotheses = input_data.get('hypotheses', [])
-        insights = input_data.get('insights', [])
-        researcher_analysis = input_data.get('researcher_analysis', '')
-        critique = input_data.get('critique', '')
+        if input_data.status != 'success':
+            return SynthesizerResult(
+                agent=self.name,
+                status="error",
+                message="Invalid input from previous agent"
+            )
         
-        # Retrieve context for gap identification
-        gap_query = f"research gaps limitations future work {query}"
-        context_result = self.retrieve_context(gap_query, k=5)
+        researcher_analysis = input_data.researcher_analysis
+        critique = input_data.critique
+        strengths = input_data.strengths
+        weaknesses = input_data.weaknesses
         
-        system_prompt = """You are a research questioner. Your task is to identify knowledge gaps and generate critical follow-up questions.
+        # Retrieve context for synthesis
+        if context_result is None:
+            context_result = await self.aprefetch_context(query)
+        
+        sections = _fit_sections(
+            {
+                "researcher_analysis": researcher_analysis,
+                "critique": critique,
+                "additional_context": context_result.get('answer', 'No additional context available')
+            },
+            self.PROMPT_TOKEN_BUDGET
+        )
+        user_prompt = self.USER_PROMPT.format(
+            query=query,
+            strength_list=_bulleted(strengths[:5]),
+            weakness_list=_bulleted(weaknesses[:5]),
+            **sections
+        )
+
+        try:
+            synthesis, lines = await self._agenerate(user_prompt, on_token)
+            
+            logger.info(f"{self.name}: Synthesis complete")
+            
+            extracted = _extract_all(lines, ["hypotheses", "insights"])
+            return SynthesizerResult(
+                agent=self.name,
+                status="success",
+                synthesis=synthesis,
+                hypotheses=extracted["hypotheses"],
+                insights=extracted["insights"],
+                researcher_analysis=researcher_analysis,
+                critique=critique
+            )
+        except Exception as e:
+            logger.error(f"{self.name} error: {str(e)}")
+            return SynthesizerResult(agent=self.name, status="error", message=str(e))
+
+
+class QuestionerAgent(BaseAgent):
+    """Agent that identifies gaps and generates follow-up questions."""
+    
+    PROGRESS_MESSAGE = "Identifying research gaps and generating questions..."
+    
+    CONTEXT_QUERY = "research gaps limitations future work {query}"
+    CONTEXT_K = 5
+    
+    SYSTEM_PROMPT = """You are a research questioner. Your task is to identify knowledge gaps and generate critical follow-up questions.
 
 CRITICAL RULES:
 1. Identify gaps based on the actual analysis and synthesis provided
@@ -534,26 +996,29 @@ Format your output with:
 - Critical Questions
 - Research Priorities
 """
-        
-        user_prompt = f"""Identify gaps and generate questions based on the following research analysis related to: {query}
+    _SYSTEM_MESSAGE = SystemMessage(content=SYSTEM_PROMPT)
+    
+    USER_PROMPT = PromptTemplate(
+        input_variables=["query", "synthesis", "hypothesis_list", "insight_list", "researcher_excerpt", "critique_excerpt", "additional_context"],
+        template="""Identify gaps and generate questions based on the following research analysis related to: {query}
 
 SYNTHESIS AND HYPOTHESES:
 {synthesis}
 
 HYPOTHESES GENERATED:
-{chr(10).join([f"- {h}" for h in hypotheses[:5]])}
+{hypothesis_list}
 
 KEY INSIGHTS:
-{chr(10).join([f"- {i}" for i in insights[:5]])}
+{insight_list}
 
 RESEARCHER'S ANALYSIS:
-{researcher_analysis[:500]}...
+{researcher_excerpt}...
 
 REVIEWER'S CRITIQUE:
-{critique[:500]}...
+{critique_excerpt}...
 
 ADDITIONAL CONTEXT:
-{context_result.get('answer', 'No additional context available')}
+{additional_context}
 
 Please identify:
 1. Knowledge gaps in the current research
@@ -563,87 +1028,112 @@ Please identify:
 5. Areas needing further investigation
 
 Remember: Questions should be specific and answerable. Base gaps on actual limitations identified."""
-
-        try:
-            messages = [
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=user_prompt)
-            ]
-            response = self.llm.invoke(messages)
-            gap_analysis = response.content if hasattr(response, 'content') else str(response)
-            
-            logger.info(f"{self.name}: Gap analysis complete")
-            
-            return {
-                "agent": self.name,
-                "status": "success",
-                "gap_analysis": gap_analysis,
-                "gaps": self._extract_gaps(gap_analysis),
-                "questions": self._extract_questions(gap_analysis),
-                "synthesis": synthesis,
-                "hypotheses": hypotheses
-            }
-        except Exception as e:
-            logger.error(f"{self.name} error: {str(e)}")
-            return {
-                "agent": self.name,
-                "status": "error",
-                "message": str(e),
-                "gaps": [],
-                "questions": []
-            }
-    
-    def _extract_gaps(self, text: str) -> List[str]:
-        """Extract knowledge gaps from text."""
-        gaps = []
-        lines = text.split('\n')
-        for line in lines:
-            if 'gap' in line.lower() and line.strip() and len(line.strip()) > 20:
-                gaps.append(line.strip())
-        return gaps[:5]
-    
-    def _extract_questions(self, text: str) -> List[str]:
-        """Extract questions from text."""
-        questions = []
-        lines = text.split('\n')
-        for line in lines:
-            if '?' in line and line.strip() and len(line.strip()) > 10:
-                questions.append(line.strip())
-        return questions[:7]
-
-
-class FormatterAgent(BaseAgent):
-    """Agent that compiles the final research report."""
+    )
     
-    def __init__(self, rag_pipeline: RAGPipeline, temperature: float = 0.3):
+    def __init__(
+        self,
+        rag_pipeline: RAGPipeline,
+        temperature: float = 0.4,
+        response_cache: Optional[LLMResponseCache] = None,
+        context_cache: Optional[Dict[Tuple[str, int], Dict]] = None
+    ):
         super().__init__(
-            name="FORMATTER",
-            role="Compiles a comprehensive research report from all agent outputs",
+            name="QUESTIONER",
+            role="Identifies research gaps and generates critical follow-up questions",
             rag_pipeline=rag_pipeline,
             temperature=temperature,
-            max_retrieval_docs=0  # Formatter doesn't need to retrieve new docs
+            max_retrieval_docs=6,
+            response_cache=response_cache,
+            context_cache=context_cache
         )
     
-    def process(self, input_data: Dict, query: str) -> Dict:
+    def describe_result(self, result: QuestionerResult) -> str:
+        """Number of questions identified."""
+        return f"Identified {len(result.questions)} research questions"
+    
+    async def aprocess(
+        self,
+        input_data: SynthesizerResult,
+        query: str,
+        context_result: Optional[Dict] = None,
+        on_token: Optional[Callable[[str], None]] = None
+    ) -> QuestionerResult:
         """
-        Compile final report from all agent outputs.
+        Identify gaps and generate questions.
         
         Args:
-            input_data: Complete workflow data from all agents
+            input_data: Output from SynthesizerAgent
             query: Original research query
+            context_result: Prefetched auxiliary retrieval (retrieved on demand if None)
+            on_token: Called with each chunk of the response as it is generated (optional)
             
         Returns:
-            Dictionary with formatted report
+            QuestionerResult with the gaps and questions
         """
-        logger.info(f"{self.name}: Compiling final report...")
+        logger.info(f"{self.name}: Identifying gaps and generating questions...")
         
-        # Extract data from all agents
-        researcher_data = input_data.get('researcher', {})
-        reviewer_data = input_data.get('reviewer', {})
-        synthesizer_data = input_data.get('synthesizer', {})
-        questioner_data = input_data.get('questioner', {})
+        if input_data.status != 'success':
+            return QuestionerResult(
+                agent=self.name,
+                status="error",
+                message="Invalid input from previous agent"
+            )
+        
+        synthesis = input_data.synthesis
+        hypotheses = input_data.hypotheses
+        insights = input_data.insights
+        researcher_analysis = input_data.researcher_analysis
+        critique = input_data.critique
         
-        system_prompt = """You are a research report formatter. Your task is to compile a comprehensive, well-structured research report from multiple agent analyses.
+        # Retrieve context for gap identification
+        if context_result is None:
+            context_result = await self.aprefetch_context(query)
+        
+        sections = _fit_sections(
+            {
+                "synthesis": synthesis,
+                "additional_context": context_result.get('answer', 'No additional context available')
+            },
+            self.PROMPT_TOKEN_BUDGET
+        )
+        user_prompt = self.USER_PROMPT.format(
+            query=query,
+            hypothesis_list=_bulleted(hypotheses[:5]),
+            insight_list=_bulleted(insights[:5]),
+            researcher_excerpt=researcher_analysis[:500],
+            critique_excerpt=critique[:500],
+            **sections
+        )
+
+        try:
+            gap_analysis, lines = await self._agenerate(user_prompt, on_token)
+            
+            logger.info(f"{self.name}: Gap analysis complete")
+            
+            extracted = _extract_all(lines, ["gaps", "questions"])
+            return QuestionerResult(
+                agent=self.name,
+                status="success",
+                gap_analysis=gap_analysis,
+                gaps=extracted["gaps"],
+                questions=extracted["questions"],
+                synthesis=synthesis,
+                hypotheses=hypotheses
+            )
+        except Exception as e:
+            logger.error(f"{self.name} error: {str(e)}")
+            return QuestionerResult(agent=self.name, status="error", message=str(e))
+
+
+class FormatterAgent(BaseAgent):
+    """Agent that compiles the final research report."""
+    
+    PROGRESS_MESSAGE = "Compiling final research report..."
+    
+    # Larger budget: the report is compiled from every agent's full output
+    PROMPT_TOKEN_BUDGET = 16000
+    
+    SYSTEM_PROMPT = """You are a research report formatter. Your task is to compile a comprehensive, well-structured research report from multiple agent analyses.
 
 CRITICAL RULES:
 1. Organize information clearly and logically
@@ -664,59 +1154,118 @@ Format the report with:
 - Conclusions
 - Sources
 """
-        
-        user_prompt = f"""Compile a comprehensive research report for: {query}
+    _SYSTEM_MESSAGE = SystemMessage(content=SYSTEM_PROMPT)
+    
+    USER_PROMPT = PromptTemplate(
+        input_variables=["query", "analysis", "critique", "synthesis", "hypothesis_list", "gap_analysis", "question_list", "source_list"],
+        template="""Compile a comprehensive research report for: {query}
 
 RESEARCHER'S ANALYSIS:
-{researcher_data.get('analysis', 'N/A')}
+{analysis}
 
 REVIEWER'S CRITIQUE:
-{reviewer_data.get('critique', 'N/A')}
+{critique}
 
 SYNTHESIZER'S SYNTHESIS:
-{synthesizer_data.get('synthesis', 'N/A')}
+{synthesis}
 
 HYPOTHESES:
-{chr(10).join([f"- {h}" for h in synthesizer_data.get('hypotheses', [])])}
+{hypothesis_list}
 
 QUESTIONER's GAP ANALYSIS:
-{questioner_data.get('gap_analysis', 'N/A')}
+{gap_analysis}
 
 RESEARCH QUESTIONS:
-{chr(10).join([f"- {q}" for q in questioner_data.get('questions', [])])}
+{question_list}
 
 SOURCES:
-{chr(10).join([f"- {s.get('source', 'Unknown')}" for s in researcher_data.get('sources', [])[:10]])}
+{source_list}
 
 Please compile a comprehensive research report with proper structure, citations, and all key information from the analyses above."""
+    )
+    
+    def __init__(
+        self,
+        rag_pipeline: Optional[RAGPipeline] = None,
+        temperature: float = 0.3,
+        response_cache: Optional[LLMResponseCache] = None,
+        context_cache: Optional[Dict[Tuple[str, int], Dict]] = None
+    ):
+        super().__init__(
+            name="FORMATTER",
+            role="Compiles a comprehensive research report from all agent outputs",
+            rag_pipeline=rag_pipeline,
+            temperature=temperature,
+            max_retrieval_docs=0,  # Formatter doesn't need to retrieve new docs
+            response_cache=response_cache,
+            context_cache=context_cache
+        )
+    
+    def describe_result(self, result: FormatterResult) -> str:
+        """Report completion notice."""
+        return "Report compiled"
+    
+    async def aprocess(
+        self,
+        input_data: WorkflowResult,
+        query: str,
+        context_result: Optional[Dict] = None,
+        on_token: Optional[Callable[[str], None]] = None
+    ) -> FormatterResult:
+        """
+        Compile final report from all agent outputs.
+        
+        Args:
+            input_data: Workflow result holding the results of the previous agents
+            query: Original research query
+            context_result: Unused; the formatter does not retrieve
+            on_token: Called with each chunk of the response as it is generated (optional)
+            
+        Returns:
+            FormatterResult with the formatted report
+        """
+        logger.info(f"{self.name}: Compiling final report...")
+        
+        # Extract data from all agents
+        researcher_data: ResearcherResult = input_data.researcher
+        reviewer_data: ReviewerResult = input_data.reviewer
+        synthesizer_data: SynthesizerResult = input_data.synthesizer
+        questioner_data: QuestionerResult = input_data.questioner
+        
+        sections = _fit_sections(
+            {
+                "analysis": researcher_data.analysis,
+                "critique": reviewer_data.critique,
+                "synthesis": synthesizer_data.synthesis,
+                "gap_analysis": questioner_data.gap_analysis
+            },
+            self.PROMPT_TOKEN_BUDGET
+        )
+        user_prompt = self.USER_PROMPT.format(
+            query=query,
+            hypothesis_list=_bulleted(synthesizer_data.hypotheses),
+            question_list=_bulleted(questioner_data.questions),
+            source_list=_bulleted(s.get('source', 'Unknown') for s in researcher_data.sources[:10]),
+            **sections
+        )
 
         try:
-            messages = [
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=user_prompt)
-            ]
-            response = self.llm.invoke(messages)
-            report = response.content if hasattr(response, 'content') else str(response)
+            report, _ = await self._agenerate(user_prompt, on_token)
             
             logger.info(f"{self.name}: Report compiled")
             
-            return {
-                "agent": self.name,
-                "status": "success",
-                "report": report,
-                "query": query,
-                "researcher": researcher_data,
-                "reviewer": reviewer_data,
-                "synthesizer": synthesizer_data,
-                "questioner": questioner_data,
-                "sources": researcher_data.get('sources', [])
-            }
+            return FormatterResult(
+                agent=self.name,
+                status="success",
+                report=report,
+                query=query,
+                researcher=researcher_data,
+                reviewer=reviewer_data,
+                synthesizer=synthesizer_data,
+                questioner=questioner_data,
+                sources=researcher_data.sources
+            )
         except Exception as e:
             logger.error(f"{self.name} error: {str(e)}")
-            return {
-                "agent": self.name,
-                "status": "error",
-                "message": str(e),
-                "report": ""
-            }
+            return FormatterResult(agent=self.name, status="error", message=str(e))
 
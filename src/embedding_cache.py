@@ -0,0 +1,241 @@
+"""
+Embedding Cache Module
+Memoizes query embeddings so identical texts are only embedded once, and
+batches concurrent query embeddings into one request.
+"""
+
+import asyncio
+import hashlib
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+from typing import List, Optional, Set, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    LangChain embeddings wrapper with a thread-safe LRU cache of query embeddings.
+
+    The same texts are embedded repeatedly in a workflow (the research query by
+    the workflow cache and again for retrieval, cache lookups of similar
+    prompts, ...). Query embeddings are cached by task type and a digest of the
+    text; document embeddings made for indexing (no task type) are passed
+    through uncached, since chunks are rarely embedded twice.
+    """
+
+    QUERY_TASK_TYPE = "RETRIEVAL_QUERY"
+
+    def __init__(self, embeddings: Embeddings, max_entries: int = 4096):
+        """
+        Initialize the cache.
+
+        Args:
+            embeddings: Embeddings model to wrap
+            max_entries: Maximum number of cached embeddings (least recently used are evicted)
+        """
+        self.embeddings = embeddings
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[Tuple[str, bytes], List[float]]" = OrderedDict()
+        # Retrieval runs in worker threads, so lookups and inserts are locked
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def __getattr__(self, name):
+        # Expose the wrapped model's attributes (model name, client, ...)
+        if name == "embeddings":
+            raise AttributeError(name)
+        return getattr(self.embeddings, name)
+
+    @staticmethod
+    def _key(task_type: str, text: str) -> Tuple[str, bytes]:
+        """Cache key: the task type and a 128-bit digest of the text."""
+        return task_type, hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+    def _lookup(self, keys: List[Tuple[str, bytes]]) -> List[Optional[List[float]]]:
+        """Cached embeddings for the keys (None for misses)."""
+        with self._lock:
+            vectors = []
+            for key in keys:
+                vector = self._cache.get(key)
+                if vector is None:
+                    self.misses += 1
+                else:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                vectors.append(vector)
+            return vectors
+
+    def _store(self, keys: List[Tuple[str, bytes]], vectors: List[List[float]]):
+        """Cache embeddings, evicting the least recently used."""
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                self._cache[key] = vector
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a search query, reusing the cached embedding of identical text."""
+        key = self._key(self.QUERY_TASK_TYPE, text)
+        vector = self._lookup([key])[0]
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self._store([key], [vector])
+        return vector
+
+    def embed_documents(self, texts: List[str], task_type: Optional[str] = None, **kwargs) -> List[List[float]]:
+        """
+        Embed texts; with a task type, cached embeddings are reused and only the
+        remaining texts are sent, in one request.
+        """
+        if task_type is None:
+            return self.embeddings.embed_documents(texts, **kwargs)
+
+        keys = [self._key(task_type, text) for text in texts]
+        vectors = self._lookup(keys)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            embedded = self.embeddings.embed_documents(
+                [texts[i] for i in missing], task_type=task_type, **kwargs
+            )
+            self._store([keys[i] for i in missing], embedded)
+            for i, vector in zip(missing, embedded):
+                vectors[i] = vector
+        return vectors
+
+    def clear(self):
+        """Remove all cached embeddings."""
+        with self._lock:
+            self._cache.clear()
+
+    def get_stats(self) -> dict:
+        """Get cache hit/miss statistics."""
+        return {
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+class _LoopBatch:
+    """Batching state of MicroBatchEmbeddings for one event loop."""
+
+    __slots__ = ("pending", "timer", "tasks")
+
+    def __init__(self):
+        # Texts waiting for the next batch, with the futures of their callers
+        self.pending: List[Tuple[str, asyncio.Future]] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+        # Running batch requests (the loop only keeps weak references to tasks)
+        self.tasks: Set[asyncio.Task] = set()
+
+
+class MicroBatchEmbeddings(Embeddings):
+    """
+    LangChain embeddings wrapper that batches concurrent async query embeddings.
+
+    aembed_query calls made within batch_wait_timeout_s of each other (up to
+    max_batch_size) are sent as one embed_documents request, so agents and
+    workflows embedding at the same time share a network round-trip.
+    Synchronous calls are passed through unchanged.
+
+    Pending texts and the batch timer are kept per event loop, since every
+    synchronous workflow run uses a fresh loop.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        max_batch_size: int = 32,
+        batch_wait_timeout_s: float = 0.002,
+        query_task_type: Optional[str] = "RETRIEVAL_QUERY"
+    ):
+        """
+        Initialize the batcher.
+
+        Args:
+            embeddings: Embeddings model to wrap
+            max_batch_size: Maximum number of texts per request
+            batch_wait_timeout_s: How long the first text of a batch waits for others
+            query_task_type: Task type that makes embed_documents match embed_query
+                             (None if the model has no task types)
+        """
+        self.embeddings = embeddings
+        self.max_batch_size = max_batch_size
+        self.batch_wait_timeout_s = batch_wait_timeout_s
+        self.query_task_type = query_task_type
+
+        # Event loop -> its batching state; dropped with the loop
+        self._batches: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopBatch]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def __getattr__(self, name):
+        # Expose the wrapped model's attributes (cache statistics, model name, ...)
+        if name == "embeddings":
+            raise AttributeError(name)
+        return getattr(self.embeddings, name)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+    def embed_documents(self, texts: List[str], **kwargs) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts, **kwargs)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Embed a search query, batched with other queries embedded at the same time."""
+        loop = asyncio.get_running_loop()
+        state = self._batches.get(loop)
+        if state is None:
+            state = self._batches[loop] = _LoopBatch()
+
+        # Callers cancelled while waiting no longer need their texts embedded
+        state.pending = [(pending_text, f) for pending_text, f in state.pending if not f.done()]
+        future = loop.create_future()
+        state.pending.append((text, future))
+
+        if len(state.pending) >= self.max_batch_size:
+            self._flush(loop, state)
+        elif state.timer is None:
+            state.timer = loop.call_later(self.batch_wait_timeout_s, self._flush, loop, state)
+        return await future
+
+    def _flush(self, loop: asyncio.AbstractEventLoop, state: _LoopBatch):
+        """Send a loop's pending texts as one batch."""
+        if state.timer is not None:
+            state.timer.cancel()
+            state.timer = None
+        batch = [(text, future) for text, future in state.pending if not future.done()]
+        state.pending = []
+        if batch:
+            task = loop.create_task(self._embed_batch(batch))
+            state.tasks.add(task)
+            task.add_done_callback(state.tasks.discard)
+
+    async def _embed_batch(self, batch: List[Tuple[str, asyncio.Future]]):
+        """Embed a batch in a worker thread and resolve its callers' futures."""
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        kwargs = {"task_type": self.query_task_type} if self.query_task_type else {}
+        try:
+            vectors = await asyncio.to_thread(self.embeddings.embed_documents, texts, **kwargs)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        by_text = dict(zip(texts, vectors))
+        for text, future in batch:
+            if not future.done():
+                future.set_result(by_text[text])
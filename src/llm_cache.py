@@ -0,0 +1,343 @@
+"""
+LLM Response Cache Module
+Caches agent LLM responses so repeated or paraphrased prompts skip the Gemini call.
+"""
+
+import os
+import time
+import zlib
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+
+# Handle both script execution and module import
+try:
+    from .semantic_cache import quantize_int8, dequantize_int8
+except ImportError:
+    # For script execution
+    import sys
+    from pathlib import Path
+    sys.path.append(str(Path(__file__).parent))
+    from semantic_cache import quantize_int8, dequantize_int8
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Input tokens read by models/text-embedding-004; the rest of a prompt is ignored
+_EMBEDDING_MAX_TOKENS = 2048
+# Characters per token assumed when locating that limit in a prompt, kept below
+# the ~4 of English text so the cut falls before the model's own truncation
+_CHARS_PER_TOKEN = 3
+
+
+class LLMResponseCache:
+    """
+    Multi-tier cache for LLM responses keyed on (system_prompt, user_prompt, llm_id).
+
+    Lookups go through:
+    1. Exact match - LRU keyed on the SHA-256 of the prompts and the model settings
+    2. Persistent exact match - SQLite table with the same keys, which survives
+       process restarts
+    3. Semantic match - cosine similarity between the embedding of the user
+       prompt and previous user prompts sent with the same system prompt and model.
+       The embedding model only reads the start of long prompts, so their
+       remainder must match exactly as well
+
+    The persistent tier is only used when a database path is provided, and the
+    semantic tier only when an embedding model is provided. Prompt embeddings
+    are kept quantized to int8.
+    """
+
+    def __init__(
+        self,
+        embeddings=None,
+        max_entries: int = 512,
+        similarity_threshold: float = 0.92,
+        db_path: Optional[str] = None,
+        ttl_seconds: Optional[int] = 7 * 24 * 3600,
+        embedding_max_tokens: int = _EMBEDDING_MAX_TOKENS
+    ):
+        """
+        Initialize the response cache.
+
+        Args:
+            embeddings: LangChain embeddings model used for the semantic tier (optional)
+            max_entries: Maximum number of cached responses (least recently used are evicted)
+            similarity_threshold: Minimum cosine similarity for a semantic hit
+            db_path: SQLite file for the persistent tier (optional, "~" is expanded)
+            ttl_seconds: Age after which persisted responses expire (None keeps them forever)
+            embedding_max_tokens: Input tokens read by the embedding model
+        """
+        self.embeddings = embeddings
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self._embedded_chars = embedding_max_tokens * _CHARS_PER_TOKEN
+
+        self._db = None
+        # The persistent tier is read and written from worker threads
+        self._db_lock = threading.Lock()
+        if db_path is not None:
+            self._db = self._open_db(os.path.expanduser(db_path))
+
+        # key -> (namespace, (int8 normalized embedding, scale) or None, response)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # Embeddings computed on a miss, reused when the response is stored
+        # (dropped through discard if no response follows)
+        self._pending_vectors: Dict[str, np.ndarray] = {}
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def _open_db(self, path: str) -> Optional[sqlite3.Connection]:
+        """Open (and create if needed) the persistent cache, dropping expired entries."""
+        try:
+            db = sqlite3.connect(path, check_same_thread=False)
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache(key BLOB PRIMARY KEY, value BLOB, ts INTEGER)"
+            )
+            if self.ttl_seconds is not None:
+                db.execute("DELETE FROM llm_cache WHERE ts < ?", (int(time.time()) - self.ttl_seconds,))
+            db.commit()
+            logger.info(f"Persistent LLM response cache: {path}")
+            return db
+        except sqlite3.Error as e:
+            logger.warning(f"Could not open persistent LLM response cache at {path}: {str(e)}")
+            return None
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        """SHA-256 hex digest of a string."""
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def _key(self, system_prompt: str, user_prompt: str, llm_id: str) -> str:
+        """Exact-match key for a prompt pair sent to a model."""
+        return self._hash(system_prompt + "\x1f" + user_prompt + "\x1f" + llm_id)
+
+    def _namespace(self, system_prompt: str, user_prompt: str, llm_id: str) -> str:
+        """
+        Group of prompts that may be semantic matches of each other.
+
+        Prompts only match within the same system prompt and model, and with the
+        same text past what the embedding model reads: two prompts differing
+        only there would otherwise embed (almost) identically.
+        """
+        unembedded = user_prompt[self._embedded_chars:]
+        return self._hash(system_prompt + "\x1f" + llm_id + "\x1f" + unembedded)
+
+    def _db_get(self, key: str) -> Optional[str]:
+        """Read a response from the persistent tier (blocking; see aget)."""
+        query = "SELECT value FROM llm_cache WHERE key = ?"
+        params = (bytes.fromhex(key),)
+        if self.ttl_seconds is not None:
+            query += " AND ts >= ?"
+            params += (int(time.time()) - self.ttl_seconds,)
+        try:
+            with self._db_lock:
+                row = self._db.execute(query, params).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read persistent LLM response cache: {str(e)}")
+            return None
+        return zlib.decompress(row[0]).decode('utf-8') if row else None
+
+    def _db_put(self, key: str, response: str):
+        """Write a response to the persistent tier (blocking; see aput)."""
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache(key, value, ts) VALUES (?, ?, ?)",
+                    (bytes.fromhex(key), zlib.compress(response.encode('utf-8')), int(time.time()))
+                )
+                self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not write persistent LLM response cache: {str(e)}")
+
+    async def _aembed(self, text: str) -> np.ndarray:
+        """Embed text and L2-normalize it so dot products are cosine similarities."""
+        vector = np.asarray(await self.embeddings.aembed_query(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _semantic_search(self, namespace: str, vector: np.ndarray) -> Optional[str]:
+        """Return the key of the most similar cached prompt above the threshold."""
+        keys = []
+        vectors = []
+        scales = []
+        for key, (entry_namespace, entry_vector, _) in self._entries.items():
+            if entry_namespace == namespace and entry_vector is not None:
+                keys.append(key)
+                vectors.append(entry_vector[0])
+                scales.append(entry_vector[1])
+        if not vectors:
+            return None
+
+        scores = dequantize_int8(np.stack(vectors), scales) @ vector
+        best = int(np.argmax(scores))
+        if scores[best] >= self.similarity_threshold:
+            return keys[best]
+        return None
+
+    def _store(self, key: str, namespace: str, vector: Optional[np.ndarray], response: str):
+        """Insert an entry into the in-memory tiers, evicting the least recently used."""
+        self._entries[key] = (namespace, quantize_int8(vector) if vector is not None else None, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def aget(self, system_prompt: str, user_prompt: str, llm_id: str = "") -> Optional[str]:
+        """
+        Look up a cached response.
+
+        Args:
+            system_prompt: System prompt sent to the LLM
+            user_prompt: User prompt sent to the LLM
+            llm_id: Identifies the model and its settings (e.g. name and temperature)
+
+        Returns:
+            Cached response text, or None on a miss
+        """
+        key = self._key(system_prompt, user_prompt, llm_id)
+        namespace = self._namespace(system_prompt, user_prompt, llm_id)
+
+        # Tier 1: exact match
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+        # Tier 2: exact match persisted by an earlier process (read in a worker
+        # thread so concurrent workflows are not blocked on the disk)
+        if self._db is not None:
+            response = await asyncio.to_thread(self._db_get, key)
+            if response is not None:
+                self._store(key, namespace, None, response)
+                self.disk_hits += 1
+                return response
+
+        # Tier 3: semantic match within the same namespace
+        if self.embeddings is not None:
+            try:
+                vector = await self._aembed(user_prompt)
+            except Exception as e:
+                logger.warning(f"Could not embed prompt for semantic cache: {str(e)}")
+            else:
+                match = self._semantic_search(namespace, vector)
+                if match is not None:
+                    self._entries.move_to_end(match)
+                    self.semantic_hits += 1
+                    return self._entries[match][2]
+                self._pending_vectors[key] = vector
+
+        self.misses += 1
+        return None
+
+    async def aput(self, system_prompt: str, user_prompt: str, response: str, llm_id: str = ""):
+        """
+        Store a response.
+
+        Args:
+            system_prompt: System prompt sent to the LLM
+            user_prompt: User prompt sent to the LLM
+            response: Response text returned by the LLM
+            llm_id: Identifies the model and its settings (e.g. name and temperature)
+        """
+        key = self._key(system_prompt, user_prompt, llm_id)
+        vector = self._pending_vectors.pop(key, None)
+        if vector is None and self.embeddings is not None:
+            try:
+                vector = await self._aembed(user_prompt)
+            except Exception as e:
+                logger.warning(f"Could not embed prompt for semantic cache: {str(e)}")
+
+        self._store(key, self._namespace(system_prompt, user_prompt, llm_id), vector, response)
+        if self._db is not None:
+            await asyncio.to_thread(self._db_put, key, response)
+
+    def discard(self, system_prompt: str, user_prompt: str, llm_id: str = ""):
+        """
+        Forget a miss whose response will not be stored (e.g. the generation failed).
+
+        Args:
+            system_prompt: System prompt sent to the LLM
+            user_prompt: User prompt sent to the LLM
+            llm_id: Identifies the model and its settings (e.g. name and temperature)
+        """
+        self._pending_vectors.pop(self._key(system_prompt, user_prompt, llm_id), None)
+
+    def clear(self):
+        """Remove all cached responses, including persisted ones."""
+        self._entries.clear()
+        self._pending_vectors.clear()
+        if self._db is not None:
+            try:
+                with self._db_lock:
+                    self._db.execute("DELETE FROM llm_cache")
+                    self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Could not clear persistent LLM response cache: {str(e)}")
+
+    def get_stats(self) -> Dict:
+        """Get cache hit/miss statistics."""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses
+        }
+
+
+class DeferredResponseCache:
+    """
+    View of an LLMResponseCache that reads through but holds writes back.
+
+    Used for speculative generations, whose responses must not be served to
+    other prompts unless the speculation is kept: writes reach the cache on
+    acommit and are dropped on rollback.
+    """
+
+    def __init__(self, cache: LLMResponseCache):
+        """
+        Initialize the view.
+
+        Args:
+            cache: Cache to read from and eventually write to
+        """
+        self.cache = cache
+        self._writes = []
+
+    async def aget(self, system_prompt: str, user_prompt: str, llm_id: str = "") -> Optional[str]:
+        """Look up a cached response (see LLMResponseCache.aget)."""
+        return await self.cache.aget(system_prompt, user_prompt, llm_id)
+
+    async def aput(self, system_prompt: str, user_prompt: str, response: str, llm_id: str = ""):
+        """Hold a response back until acommit."""
+        self._writes.append((system_prompt, user_prompt, response, llm_id))
+
+    def discard(self, system_prompt: str, user_prompt: str, llm_id: str = ""):
+        """Forget a miss whose response will not be stored (see LLMResponseCache.discard)."""
+        self.cache.discard(system_prompt, user_prompt, llm_id)
+
+    async def acommit(self):
+        """Store the held-back responses."""
+        writes, self._writes = self._writes, []
+        for system_prompt, user_prompt, response, llm_id in writes:
+            await self.cache.aput(system_prompt, user_prompt, response, llm_id)
+
+    def rollback(self):
+        """Drop the held-back responses."""
+        writes, self._writes = self._writes, []
+        for system_prompt, user_prompt, _, llm_id in writes:
+            self.cache.discard(system_prompt, user_prompt, llm_id)
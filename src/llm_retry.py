@@ -0,0 +1,98 @@
+"""
+LLM Retry Module
+Retries Gemini requests that fail with transient errors instead of failing the workflow,
+and throttles all Gemini requests of the process to a per-minute quota.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+
+from google.api_core.exceptions import ResourceExhausted, ServiceUnavailable
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Gemini errors worth retrying: rate limiting (429) and temporary unavailability (503)
+TRANSIENT_ERRORS = (ResourceExhausted, ServiceUnavailable)
+
+
+def _log_retry(state):
+    """Log a transient error before waiting to retry."""
+    logger.warning(
+        f"Transient LLM error ({state.outcome.exception()}), retrying (attempt {state.attempt_number})"
+    )
+
+
+# Decorator for functions making one Gemini request (sync or async). Up to 4
+# attempts; the waits grow exponentially up to 30 s and are fully randomized so
+# callers throttled at the same moment do not retry in lockstep. This is the
+# only retry layer: the ChatGoogleGenerativeAI clients are built with
+# max_retries=1, so their own retries do not multiply these attempts.
+retry_transient = retry(
+    stop=stop_after_attempt(4),
+    wait=wait_random_exponential(min=1, max=30),
+    retry=retry_if_exception_type(TRANSIENT_ERRORS),
+    before_sleep=_log_retry,
+    reraise=True
+)
+
+
+class RequestRateLimiter:
+    """
+    Token bucket that keeps the process's LLM requests within a per-minute quota.
+
+    Shared by the agents and the RAG pipeline. acquire is for coroutines and
+    wait for synchronous callers; both draw from the same bucket.
+    """
+
+    def __init__(self, requests_per_minute: int):
+        """
+        Initialize the limiter.
+
+        Args:
+            requests_per_minute: Requests allowed per minute (bursts up to this many)
+        """
+        self.requests_per_minute = requests_per_minute
+        self.capacity = float(requests_per_minute)
+        self.rate = requests_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        # Synchronous callers may run in worker threads
+        self._lock = threading.Lock()
+
+    def _take(self) -> float:
+        """Take a token if one is available; otherwise return the seconds until one is."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    async def acquire(self):
+        """Wait until a request may be sent."""
+        while True:
+            delay = self._take()
+            if not delay:
+                return
+            await asyncio.sleep(delay)
+
+    def wait(self):
+        """Block until a request may be sent."""
+        while True:
+            delay = self._take()
+            if not delay:
+                return
+            time.sleep(delay)
+
+
+RATE_LIMITER = RequestRateLimiter(int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "60")))
@@ -5,34 +5,40 @@ Manages the workflow: RESEARCHER → REVIEWER → SYNTHESIZER → QUESTIONER →
 
 import os
 import sys
+import copy
+import asyncio
 import logging
+from dataclasses import dataclass, replace
 from pathlib import Path
-from typing import Dict, Optional
+from types import SimpleNamespace
+from typing import Callable, Dict, Final, List, Optional, Tuple
+
+import numpy as np
 from dotenv import load_dotenv
 
-# Handle both script execution and module import
+# orjson is optional; it serializes JSON sidecars several times faster than json
 try:
-    from .rag_pipeline import RAGPipeline
-    from .agents import (
-        ResearcherAgent,
-        ReviewerAgent,
-        SynthesizerAgent,
-        QuestionerAgent,
-        FormatterAgent
-    )
+    import orjson
+except ImportError:
+    import json
+    orjson = None
+
+# Handle both script execution and module import. The RAG pipeline and the
+# agents are imported by _import_components (see there).
+try:
+    from .llm_cache import DeferredResponseCache, LLMResponseCache
+    from .llm_retry import RATE_LIMITER
+    from .semantic_cache import SemanticLSHCache
+    from .results import QuestionerResult, WorkflowResult, WorkflowStep
 except ImportError:
     # For script execution
     import sys
     from pathlib import Path
     sys.path.append(str(Path(__file__).parent))
-    from rag_pipeline import RAGPipeline
-    from agents import (
-        ResearcherAgent,
-        ReviewerAgent,
-        SynthesizerAgent,
-        QuestionerAgent,
-        FormatterAgent
-    )
+    from llm_cache import DeferredResponseCache, LLMResponseCache
+    from llm_retry import RATE_LIMITER
+    from semantic_cache import SemanticLSHCache
+    from results import QuestionerResult, WorkflowResult, WorkflowStep
 
 load_dotenv()
 
@@ -42,21 +48,148 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Separator line used in the console output and saved reports
+_SEP70: Final[str] = "=" * 70
+_REPORT_HEADER: Final[bytes] = f"{_SEP70}\nRESEARCH REPORT\n{_SEP70}\n\n".encode('utf-8')
+_SOURCES_HEADER: Final[str] = f"\n\n{_SEP70}\nSOURCES\n{_SEP70}\n\n"
+
+# Filled by get_workflow_summary
+_SUMMARY_TEMPLATE: Final[str] = """
+WORKFLOW SUMMARY
+================
+Query: {query}
+Status: {status}
+
+Agent Results:
+- RESEARCHER: {researcher_status} ({num_sources} sources)
+- REVIEWER: {reviewer_status}
+- SYNTHESIZER: {synthesizer_status} ({num_hypotheses} hypotheses)
+- QUESTIONER: {questioner_status} ({num_questions} questions)
+- FORMATTER: {formatter_status}
+"""
+
+
+def _import_components() -> SimpleNamespace:
+    """
+    Import the RAG pipeline and the agent classes.
+    
+    They load LangChain, ChromaDB and the Gemini client, which takes seconds, so
+    they are imported when the first system is created rather than with this
+    module (e.g. for code that only inspects or saves workflow results).
+    """
+    try:
+        from .rag_pipeline import RAGPipeline
+        from .agents import (
+            ResearcherAgent,
+            ReviewerAgent,
+            SynthesizerAgent,
+            QuestionerAgent,
+            FormatterAgent
+        )
+    except ImportError:
+        # For script execution
+        from rag_pipeline import RAGPipeline
+        from agents import (
+            ResearcherAgent,
+            ReviewerAgent,
+            SynthesizerAgent,
+            QuestionerAgent,
+            FormatterAgent
+        )
+    return SimpleNamespace(
+        RAGPipeline=RAGPipeline,
+        ResearcherAgent=ResearcherAgent,
+        ReviewerAgent=ReviewerAgent,
+        SynthesizerAgent=SynthesizerAgent,
+        QuestionerAgent=QuestionerAgent,
+        FormatterAgent=FormatterAgent
+    )
+
+
+def _dumps_json(data: Dict) -> bytes:
+    """Serialize to indented UTF-8 JSON, with orjson if installed (unknown types become strings)."""
+    if orjson is not None:
+        return orjson.dumps(data, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(data, default=str, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+def _noop(*args, **kwargs):
+    """Accept anything and do nothing."""
+
+
+@dataclass(slots=True)
+class _Speculation:
+    """A FORMATTER run started on a projected QUESTIONER result."""
+    task: asyncio.Task
+    projection: QuestionerResult
+    # Holds the run's response cache writes until the speculation is kept
+    writes: Optional[DeferredResponseCache]
+    
+    def cancel(self):
+        """Stop the run and drop its responses."""
+        self.task.cancel()
+        if self.writes is not None:
+            self.writes.rollback()
+
+
+class _StatusBuffer:
+    """Collects progress lines and writes them to stdout in one call per flush."""
+    
+    def __init__(self, enabled: bool):
+        self.lines: List[str] = []
+        # Chosen once, so a quiet workflow pays a no-op call per line instead of
+        # a verbose check
+        self.add = self._queue if enabled else _noop
+    
+    def _queue(self, *lines: str):
+        """Queue lines for the next flush."""
+        self.lines.extend(lines)
+    
+    def flush(self):
+        """Write the queued lines, e.g. before waiting on the next agents."""
+        if self.lines:
+            sys.stdout.write("\n".join(self.lines) + "\n")
+            sys.stdout.flush()
+            self.lines.clear()
+
 
 class MultiAgentResearchSystem:
     """
-    Orchestrates multiple research agents in a sequential workflow.
+    Orchestrates multiple research agents in a dependency-ordered workflow.
     
     Workflow:
     START → RESEARCHER → REVIEWER → SYNTHESIZER → QUESTIONER → FORMATTER → END
     """
     
+    # Agent key -> keys of the agents whose output it consumes. Agents are run
+    # once their dependencies finish; independent agents would share a phase and
+    # run concurrently, but the current dependencies form a chain.
+    AGENT_DEPENDENCIES: Dict[str, List[str]] = {
+        "researcher": [],
+        "reviewer": ["researcher"],
+        "synthesizer": ["reviewer"],
+        "questioner": ["synthesizer"],
+        "formatter": ["researcher", "reviewer", "synthesizer", "questioner"]
+    }
+    
+    # Speculative FORMATTER: minimum query similarity of the earlier workflow whose
+    # QUESTIONER result is used as the projection, and minimum similarity between
+    # the projected and the real QUESTIONER gap analyses and question lists to
+    # keep the report
+    SPECULATION_QUERY_THRESHOLD = 0.8
+    SPECULATION_ACCEPT_THRESHOLD = 0.9
+    
     def __init__(
         self,
         vector_db_path: str = "vector_db",
         collection_name: str = "research_documents",
         llm_model: str = "gemini-2.5-flash",
-        temperature: float = 0.3
+        temperature: float = 0.3,
+        use_response_cache: bool = True,
+        response_cache_path: Optional[str] = "~/.agentic_lab_cache.db",
+        use_workflow_cache: bool = True,
+        max_concurrent_workflows: Optional[int] = None,
+        speculative_formatter: bool = False
     ):
         """
         Initialize the multi-agent research system.
@@ -66,11 +199,20 @@ class MultiAgentResearchSystem:
             collection_name: Name of ChromaDB collection
             llm_model: LLM model name
             temperature: Base temperature for agents (individual agents may override)
+            use_response_cache: Whether agents reuse LLM responses for repeated or paraphrased prompts
+            response_cache_path: SQLite file that keeps LLM responses across runs (None keeps them in memory only)
+            use_workflow_cache: Whether paraphrases of an earlier query reuse its workflow results
+            max_concurrent_workflows: Maximum workflows run_batch runs at once (defaults to
+                                      GEMINI_REQUESTS_PER_MINUTE divided by the LLM requests of one workflow)
+            speculative_formatter: Whether to start the FORMATTER alongside the QUESTIONER when a
+                                   similar earlier workflow can stand in for the QUESTIONER's result
+                                   (needs the workflow cache; costs an extra request when rejected)
         """
         logger.info("Initializing Multi-Agent Research System...")
+        components = _import_components()
         
         # Initialize RAG pipeline (shared by all agents)
-        self.rag_pipeline = RAGPipeline(
+        self.rag_pipeline = components.RAGPipeline(
             vector_db_path=vector_db_path,
             collection_name=collection_name,
             llm_model=llm_model,
@@ -78,201 +220,485 @@ class MultiAgentResearchSystem:
             max_retrieval_docs=8
         )
         
+        # Response cache (shared by all agents), using the vector store's embeddings
+        # for the semantic tier
+        self.response_cache = None
+        if use_response_cache:
+            self.response_cache = LLMResponseCache(
+                embeddings=self.rag_pipeline.vector_store.embeddings,
+                db_path=response_cache_path
+            )
+        
+        # Successful workflow results keyed by the embedding of their query
+        self.workflow_cache = SemanticLSHCache(n_tables=8, n_bits=16, threshold=0.93) if use_workflow_cache else None
+        
+        # Retrieval results keyed by (normalized query, k), shared by all agents so
+        # identical retrievals are answered once (including across workflow runs)
+        self.context_cache: Dict[Tuple[str, int], Dict] = {}
+        
         # Initialize all agents
         logger.info("Initializing agents...")
-        self.researcher = ResearcherAgent(
+        self.researcher = components.ResearcherAgent(
             rag_pipeline=self.rag_pipeline,
-            temperature=0.2  # Lower temperature for factual accuracy
+            temperature=0.2,  # Lower temperature for factual accuracy
+            response_cache=self.response_cache,
+            context_cache=self.context_cache
         )
-        self.reviewer = ReviewerAgent(
+        self.reviewer = components.ReviewerAgent(
             rag_pipeline=self.rag_pipeline,
-            temperature=0.3  # Slightly higher for critical thinking
+            temperature=0.3,  # Slightly higher for critical thinking
+            response_cache=self.response_cache,
+            context_cache=self.context_cache
         )
-        self.synthesizer = SynthesizerAgent(
+        self.synthesizer = components.SynthesizerAgent(
             rag_pipeline=self.rag_pipeline,
-            temperature=0.4  # Higher for creative synthesis
+            temperature=0.4,  # Higher for creative synthesis
+            response_cache=self.response_cache,
+            context_cache=self.context_cache
         )
-        self.questioner = QuestionerAgent(
+        self.questioner = components.QuestionerAgent(
             rag_pipeline=self.rag_pipeline,
-            temperature=0.4  # Higher for generating questions
+            temperature=0.4,  # Higher for generating questions
+            response_cache=self.response_cache,
+            context_cache=self.context_cache
         )
-        self.formatter = FormatterAgent(
-            rag_pipeline=self.rag_pipeline,
-            temperature=0.3  # Balanced for clear formatting
+        # The formatter only works from the other agents' outputs, so it gets no
+        # RAG pipeline
+        self.formatter = components.FormatterAgent(
+            temperature=0.3,  # Balanced for clear formatting
+            response_cache=self.response_cache
         )
         
+        self.agents = {
+            "researcher": self.researcher,
+            "reviewer": self.reviewer,
+            "synthesizer": self.synthesizer,
+            "questioner": self.questioner,
+            "formatter": self.formatter
+        }
+        
+        if max_concurrent_workflows is None:
+            # One request per agent, the two RAG answers of _aretrieve_contexts and
+            # a rejected speculative FORMATTER
+            requests_per_workflow = len(self.agents) + 2 + (1 if speculative_formatter else 0)
+            max_concurrent_workflows = max(1, RATE_LIMITER.requests_per_minute // requests_per_workflow)
+        self.max_concurrent_workflows = max_concurrent_workflows
+        self.speculative_formatter = speculative_formatter
+        
         logger.info("Multi-Agent Research System initialized successfully")
     
-    def run_research_workflow(self, query: str, verbose: bool = True) -> Dict:
+    def run_research_workflow(
+        self,
+        query: str,
+        verbose: bool = True,
+        on_report_token: Optional[Callable[[str], None]] = None
+    ) -> WorkflowResult:
         """
         Execute the complete research workflow.
         
         Args:
             query: Research query or topic
             verbose: Whether to print progress
+            on_report_token: Called with each chunk of the report as the FORMATTER generates it (optional)
             
         Returns:
-            Dictionary with complete workflow results
+            WorkflowResult with the result of every agent that ran
         """
-        if verbose:
-            print("\n" + "="*70)
-            print("MULTI-AGENT RESEARCH SYSTEM")
-            print("="*70)
-            print(f"Research Query: {query}")
-            print("="*70)
-            print("\nWorkflow: START → RESEARCHER → REVIEWER → SYNTHESIZER → QUESTIONER → FORMATTER → END\n")
-        
-        workflow_data = {
-            "query": query,
-            "workflow": [],
-            "researcher": {},
-            "reviewer": {},
-            "synthesizer": {},
-            "questioner": {},
-            "formatter": {},
-            "status": "in_progress"
-        }
+        return asyncio.run(self.arun_research_workflow(query, verbose=verbose, on_report_token=on_report_token))
+    
+    async def arun_research_workflow(
+        self,
+        query: str,
+        verbose: bool = True,
+        on_report_token: Optional[Callable[[str], None]] = None
+    ) -> WorkflowResult:
+        """
+        Execute the complete research workflow asynchronously.
         
-        try:
-            # STEP 1: RESEARCHER - Analyze papers
-            if verbose:
-                print("[1/5] RESEARCHER: Analyzing research papers...")
-            researcher_output = self.researcher.process(
-                input_data={"query": query},
-                query=query
-            )
-            workflow_data["researcher"] = researcher_output
-            workflow_data["workflow"].append({
-                "step": 1,
-                "agent": "RESEARCHER",
-                "status": researcher_output.get("status", "unknown")
-            })
-            
-            if researcher_output.get("status") != "success":
-                workflow_data["status"] = "error"
-                workflow_data["error"] = f"Researcher agent failed: {researcher_output.get('message', 'Unknown error')}"
-                if verbose:
-                    print(f"❌ ERROR: {workflow_data['error']}")
-                return workflow_data
+        The retrievals of the RESEARCHER, REVIEWER, SYNTHESIZER and QUESTIONER only
+        depend on the query, so they are done in one RAG call up front instead
+        of blocking each stage. Agents then run in phases derived from
+        AGENT_DEPENDENCIES (see _workflow_phases). The current dependencies form a
+        chain, so every phase holds one agent and the agents run one after another.
+        With speculative_formatter, the FORMATTER may also start before the
+        QUESTIONER finishes (see _start_speculative_formatter).
+        
+        Args:
+            query: Research query or topic
+            verbose: Whether to print progress
+            on_report_token: Called with each chunk of the report as the FORMATTER
+                             generates it, so the report can be shown before it is complete
+                             (once with the whole report when an earlier workflow is reused)
             
-            if verbose:
-                print(f"✓ RESEARCHER: Found {researcher_output.get('num_sources', 0)} sources")
+        Returns:
+            WorkflowResult with the result of every agent that ran
+        """
+        phases = self._workflow_phases()
+        
+        # Progress lines are written in one call per phase rather than one per line
+        status = _StatusBuffer(verbose)
+        stages = [" + ".join(self.agents[name].name for name in phase) for phase in phases]
+        status.add(
+            "\n" + _SEP70,
+            "MULTI-AGENT RESEARCH SYSTEM",
+            _SEP70,
+            f"Research Query: {query}",
+            _SEP70,
+            f"\nWorkflow: START → {' → '.join(stages)} → END\n"
+        )
+        status.flush()
+        
+        query_vector = None
+        if self.workflow_cache is not None:
+            query_vector = await self._aembed_query(query)
+            cached = self.workflow_cache.get(query_vector) if query_vector is not None else None
+            if cached is not None:
+                status.add(f"✓ Reusing the results of a similar earlier query: {cached.query}")
+                status.flush()
+                # The report is not generated again, so it is passed on whole
+                if on_report_token is not None:
+                    on_report_token(cached.report)
+                return replace(cached, query=query, cached_from=cached.query)
+        
+        result = WorkflowResult(query=query)
+        # Speculative FORMATTER run until the QUESTIONER finishes, then again
+        # if its projection held
+        pending_speculation = None
+        speculative_formatter = None
+        
+        try:
+            contexts = dict(zip(
+                ["researcher", "reviewer", "synthesizer", "questioner"],
+                await self._aretrieve_contexts(
+                    query,
+                    primary=self.researcher,
+                    auxiliary=[self.reviewer, self.synthesizer, self.questioner]
+                )
+            ))
             
-            # STEP 2: REVIEWER - Critique findings
-            if verbose:
-                print("[2/5] REVIEWER: Critiquing findings...")
-            reviewer_output = self.reviewer.process(
-                input_data=researcher_output,
-                query=query
-            )
-            workflow_data["reviewer"] = reviewer_output
-            workflow_data["workflow"].append({
-                "step": 2,
-                "agent": "REVIEWER",
-                "status": reviewer_output.get("status", "unknown")
-            })
+            step = 0
+            for phase in phases:
+                for offset, name in enumerate(phase, step + 1):
+                    agent = self.agents[name]
+                    status.add(f"[{offset}/{len(self.agents)}] {agent.name}: {agent.PROGRESS_MESSAGE}")
+                status.flush()
+                
+                if "questioner" in phase:
+                    pending_speculation = self._start_speculative_formatter(query, query_vector, result)
+                
+                outputs = await asyncio.gather(
+                    *(
+                        self._arun_agent(
+                            name,
+                            query,
+                            result,
+                            contexts.get(name),
+                            on_report_token,
+                            speculative_formatter
+                        )
+                        for name in phase
+                    ),
+                    return_exceptions=True
+                )
+                # BaseException so a cancelled agent (CancelledError) is not taken
+                # for a result
+                for output in outputs:
+                    if isinstance(output, BaseException):
+                        raise output
+                
+                for name, output in zip(phase, outputs):
+                    step += 1
+                    agent = self.agents[name]
+                    setattr(result, name, output)
+                    result.workflow.append(WorkflowStep(step=step, agent=agent.name, status=output.status))
+                    
+                    if output.status != "success":
+                        result.status = "error"
+                        result.error = f"{agent.name.title()} agent failed: {output.message or 'Unknown error'}"
+                        status.add(f"❌ ERROR: {result.error}")
+                        return result
+                    
+                    status.add(f"✓ {agent.name}: {agent.describe_result(output)}")
+                
+                if pending_speculation is not None:
+                    speculative_formatter = await self._aconfirm_speculation(pending_speculation, result.questioner)
+                    pending_speculation = None
             
-            if reviewer_output.get("status") != "success":
-                workflow_data["status"] = "error"
-                workflow_data["error"] = f"Reviewer agent failed: {reviewer_output.get('message', 'Unknown error')}"
-                if verbose:
-                    print(f"❌ ERROR: {workflow_data['error']}")
-                return workflow_data
+            result.status = "success"
+            result.report = result.formatter.report
+            if query_vector is not None:
+                self.workflow_cache.put(query_vector, result)
             
-            if verbose:
-                print("✓ REVIEWER: Critique complete")
+            status.add("\n" + _SEP70, "WORKFLOW COMPLETE", _SEP70)
             
-            # STEP 3: SYNTHESIZER - Generate hypotheses
-            if verbose:
-                print("[3/5] SYNTHESIZER: Synthesizing insights and generating hypotheses...")
-            synthesizer_output = self.synthesizer.process(
-                input_data=reviewer_output,
-                query=query
-            )
-            workflow_data["synthesizer"] = synthesizer_output
-            workflow_data["workflow"].append({
-                "step": 3,
-                "agent": "SYNTHESIZER",
-                "status": synthesizer_output.get("status", "unknown")
-            })
+            return result
             
-            if synthesizer_output.get("status") != "success":
-                workflow_data["status"] = "error"
-                workflow_data["error"] = f"Synthesizer agent failed: {synthesizer_output.get('message', 'Unknown error')}"
-                if verbose:
-                    print(f"❌ ERROR: {workflow_data['error']}")
-                return workflow_data
+        except Exception as e:
+            logger.error(f"Workflow error: {str(e)}")
+            result.status = "error"
+            result.error = str(e)
+            status.add(f"❌ WORKFLOW ERROR: {str(e)}")
+            return result
+        finally:
+            status.flush()
+            for speculation in (pending_speculation, speculative_formatter):
+                if speculation is not None:
+                    speculation.cancel()
+    
+    async def _aembed_query(self, query: str):
+        """Embed a query for a similarity lookup (None if embedding fails)."""
+        try:
+            return await self.rag_pipeline.vector_store.embeddings.aembed_query(query)
+        except Exception as e:
+            logger.warning(f"Could not embed query for similarity lookup: {str(e)}")
+            return None
+    
+    def _arun_agent(
+        self,
+        name: str,
+        query: str,
+        result: WorkflowResult,
+        context_result: Optional[Dict],
+        on_report_token: Optional[Callable[[str], None]],
+        speculative_formatter: Optional[_Speculation]
+    ):
+        """Coroutine producing an agent's result, reusing a confirmed speculative FORMATTER."""
+        if name == "formatter" and speculative_formatter is not None:
+            return self._aspeculative_result(speculative_formatter, result, on_report_token)
+        return self.agents[name].aprocess(
+            input_data=self._agent_input(name, query, result),
+            query=query,
+            context_result=context_result,
+            on_token=on_report_token if name == "formatter" else None
+        )
+    
+    def _start_speculative_formatter(
+        self,
+        query: str,
+        query_vector,
+        result: WorkflowResult
+    ) -> Optional[_Speculation]:
+        """
+        Start the FORMATTER on a projected QUESTIONER result.
+        
+        The projection is the QUESTIONER result of the most similar earlier
+        workflow; the report is only kept if the real QUESTIONER output turns
+        out to match it (see _aconfirm_speculation). Until then its response
+        is kept out of the response cache, where a rejected report could
+        otherwise be served for the real FORMATTER prompt.
+        
+        Args:
+            query: Research query or topic
+            query_vector: Embedding of the query (None if it could not be embedded)
+            result: Workflow result so far
             
-            hypotheses_count = len(synthesizer_output.get("hypotheses", []))
-            if verbose:
-                print(f"✓ SYNTHESIZER: Generated {hypotheses_count} hypotheses")
+        Returns:
+            The speculative run, or None if speculation is disabled or there is
+            nothing to project from
+        """
+        if not self.speculative_formatter or self.workflow_cache is None or query_vector is None:
+            return None
+        if any(
+            getattr(result, dep) is None
+            for dep in self.AGENT_DEPENDENCIES["formatter"] if dep != "questioner"
+        ):
+            return None
+        
+        earlier = self.workflow_cache.get(query_vector, threshold=self.SPECULATION_QUERY_THRESHOLD)
+        if earlier is None:
+            return None
+        
+        projection = earlier.questioner
+        formatter = copy.copy(self.formatter)
+        writes = None
+        if self.response_cache is not None:
+            writes = formatter.response_cache = DeferredResponseCache(self.response_cache)
+        task = asyncio.create_task(
+            formatter.aprocess(input_data=replace(result, questioner=projection), query=query)
+        )
+        return _Speculation(task, projection, writes)
+    
+    async def _aconfirm_speculation(
+        self,
+        speculation: _Speculation,
+        questioner: QuestionerResult
+    ) -> Optional[_Speculation]:
+        """
+        Keep the speculative FORMATTER if its projection matches the real QUESTIONER output.
+        
+        Args:
+            speculation: Output of _start_speculative_formatter
+            questioner: Actual QUESTIONER result
             
-            # STEP 4: QUESTIONER - Identify gaps
-            if verbose:
-                print("[4/5] QUESTIONER: Identifying research gaps and generating questions...")
-            questioner_output = self.questioner.process(
-                input_data=synthesizer_output,
-                query=query
+        Returns:
+            The speculation if both the gap analyses and the question lists (which
+            the report prints) are similar enough, otherwise None (it is cancelled
+            and the FORMATTER runs normally)
+        """
+        projection = speculation.projection
+        similarities = await asyncio.gather(
+            self._asimilarity(projection.gap_analysis, questioner.gap_analysis),
+            self._asimilarity("\n".join(projection.questions), "\n".join(questioner.questions))
+        )
+        if min(similarities) >= self.SPECULATION_ACCEPT_THRESHOLD:
+            logger.info(
+                f"Keeping speculative report (gap analysis similarity {similarities[0]:.2f}, "
+                f"questions similarity {similarities[1]:.2f})"
             )
-            workflow_data["questioner"] = questioner_output
-            workflow_data["workflow"].append({
-                "step": 4,
-                "agent": "QUESTIONER",
-                "status": questioner_output.get("status", "unknown")
-            })
+            return speculation
+        
+        speculation.cancel()
+        return None
+    
+    async def _asimilarity(self, projected: str, actual: str) -> float:
+        """Cosine similarity of two texts' embeddings (0 if either cannot be embedded)."""
+        if projected == actual:
+            return 1.0
+        if not projected or not actual:
+            return 0.0
+        vectors = await asyncio.gather(self._aembed_query(projected), self._aembed_query(actual))
+        if any(vector is None for vector in vectors):
+            return 0.0
+        projected_vector, actual_vector = (np.asarray(vector, dtype=np.float32) for vector in vectors)
+        norms = np.linalg.norm(projected_vector) * np.linalg.norm(actual_vector)
+        return float(projected_vector @ actual_vector / norms) if norms else 0.0
+    
+    async def _aspeculative_result(
+        self,
+        speculation: _Speculation,
+        result: WorkflowResult,
+        on_report_token: Optional[Callable[[str], None]]
+    ):
+        """Finish a confirmed speculative FORMATTER, attaching the real QUESTIONER result."""
+        output = await speculation.task
+        if speculation.writes is not None:
+            await speculation.writes.acommit()
+        if on_report_token is not None and output.report:
+            on_report_token(output.report)
+        return replace(output, questioner=result.questioner)
+    
+    def _workflow_phases(self) -> List[List[str]]:
+        """
+        Group the agents into phases by topologically sorting AGENT_DEPENDENCIES.
+        
+        Every agent in a phase only depends on agents of earlier phases, so the
+        agents of one phase can run concurrently.
+        
+        Returns:
+            List of phases, each a list of agent keys
+        """
+        remaining = {name: set(deps) for name, deps in self.AGENT_DEPENDENCIES.items()}
+        phases = []
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"Circular agent dependencies: {sorted(remaining)}")
+            phases.append(ready)
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return phases
+    
+    def _agent_input(self, name: str, query: str, result: WorkflowResult):
+        """
+        Build an agent's input from the outputs of its dependencies.
+        
+        Agents without dependencies get the query, agents with one dependency get
+        that agent's result, and agents with several get the whole workflow result.
+        """
+        deps = self.AGENT_DEPENDENCIES[name]
+        if not deps:
+            return {"query": query}
+        if len(deps) == 1:
+            return getattr(result, deps[0])
+        return result
+    
+    def run_batch(self, queries: List[str], verbose: bool = False) -> List[WorkflowResult]:
+        """
+        Execute the research workflow for several queries concurrently.
+        
+        Args:
+            queries: Research queries or topics
+            verbose: Whether to print progress (output of concurrent workflows interleaves)
             
-            if questioner_output.get("status") != "success":
-                workflow_data["status"] = "error"
-                workflow_data["error"] = f"Questioner agent failed: {questioner_output.get('message', 'Unknown error')}"
-                if verbose:
-                    print(f"❌ ERROR: {workflow_data['error']}")
-                return workflow_data
+        Returns:
+            List of workflow results, in query order
+        """
+        return asyncio.run(self.arun_batch(queries, verbose=verbose))
+    
+    async def arun_batch(self, queries: List[str], verbose: bool = False) -> List[WorkflowResult]:
+        """
+        Execute the research workflow for several queries concurrently.
+        
+        Each workflow mostly waits on network calls, so up to
+        max_concurrent_workflows of them run at once; the rate limiter shared by
+        the agents and the RAG pipeline keeps their combined LLM requests within
+        the per-minute quota.
+        
+        Args:
+            queries: Research queries or topics
+            verbose: Whether to print progress (output of concurrent workflows interleaves)
             
-            questions_count = len(questioner_output.get("questions", []))
-            if verbose:
-                print(f"✓ QUESTIONER: Identified {questions_count} research questions")
+        Returns:
+            List of workflow results, in query order
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrent_workflows)
+        
+        async def run_one(query: str) -> WorkflowResult:
+            async with semaphore:
+                return await self.arun_research_workflow(query, verbose=verbose)
+        
+        return await asyncio.gather(*(run_one(query) for query in queries))
+    
+    async def _aretrieve_contexts(self, query: str, primary, auxiliary: List) -> List[Dict]:
+        """
+        Retrieve the context for all agents with one batched RAG call.
+        
+        The primary agent's query is answered on its own. The auxiliary agents'
+        queries overlap heavily, so they are fused into one expanded query that is
+        retrieved and answered once; each auxiliary agent then picks its own
+        sources from the shared passages. Results are kept in the shared context
+        cache, so repeating a query skips both retrievals.
+        
+        Args:
+            query: Research query or topic
+            primary: Agent whose retrieval query is answered separately (the researcher)
+            auxiliary: Agents that share one fused retrieval
             
-            # STEP 5: FORMATTER - Compile report
-            if verbose:
-                print("[5/5] FORMATTER: Compiling final research report...")
-            formatter_output = self.formatter.process(
-                input_data=workflow_data,
-                query=query
+        Returns:
+            List of retrieval results: the primary agent's, then one per auxiliary agent
+        """
+        keywords = list(dict.fromkeys(
+            keyword for agent in auxiliary for keyword in agent.context_keywords()
+        ))
+        fused_query = " ".join([query] + keywords)
+        retrievals = [
+            (primary.context_query(query), primary.CONTEXT_K),
+            (fused_query, sum(agent.CONTEXT_K for agent in auxiliary))
+        ]
+        keys = [primary.context_cache_key(question, k) for question, k in retrievals]
+        
+        # Only retrieve what an earlier run has not already answered
+        contexts = {key: self.context_cache[key] for key in keys if key in self.context_cache}
+        missing = [
+            (key, retrieval) for key, retrieval in zip(keys, retrievals) if key not in contexts
+        ]
+        if missing:
+            results = await self.rag_pipeline.abatch_answer_questions(
+                [question for _, (question, _) in missing],
+                k=[k for _, (_, k) in missing]
             )
-            workflow_data["formatter"] = formatter_output
-            workflow_data["workflow"].append({
-                "step": 5,
-                "agent": "FORMATTER",
-                "status": formatter_output.get("status", "unknown")
-            })
-            
-            if formatter_output.get("status") != "success":
-                workflow_data["status"] = "error"
-                workflow_data["error"] = f"Formatter agent failed: {formatter_output.get('message', 'Unknown error')}"
-                if verbose:
-                    print(f"❌ ERROR: {workflow_data['error']}")
-                return workflow_data
-            
-            workflow_data["status"] = "success"
-            workflow_data["report"] = formatter_output.get("report", "")
-            
-            if verbose:
-                print("✓ FORMATTER: Report compiled")
-                print("\n" + "="*70)
-                print("WORKFLOW COMPLETE")
-                print("="*70)
-            
-            return workflow_data
-            
-        except Exception as e:
-            logger.error(f"Workflow error: {str(e)}")
-            workflow_data["status"] = "error"
-            workflow_data["error"] = str(e)
-            if verbose:
-                print(f"❌ WORKFLOW ERROR: {str(e)}")
-            return workflow_data
+            for (key, _), result in zip(missing, results):
+                contexts[key] = result
+                # Failures are not cached so the next run retries them
+                if 'error' not in result:
+                    self.context_cache[key] = result
+        
+        primary_context, shared_context = (contexts[key] for key in keys)
+        return [primary_context] + [agent.select_shared_context(shared_context) for agent in auxiliary]
     
-    def get_workflow_summary(self, workflow_data: Dict) -> str:
+    def get_workflow_summary(self, workflow_data: WorkflowResult) -> str:
         """
         Generate a summary of the workflow execution.
         
@@ -282,61 +708,78 @@ class MultiAgentResearchSystem:
         Returns:
             Formatted summary string
         """
-        if workflow_data.get("status") != "success":
-            return f"Workflow failed: {workflow_data.get('error', 'Unknown error')}"
+        if workflow_data.status != "success":
+            return f"Workflow failed: {workflow_data.error or 'Unknown error'}"
         
-        summary = f"""
-WORKFLOW SUMMARY
-================
-Query: {workflow_data.get('query', 'N/A')}
-Status: {workflow_data.get('status', 'N/A')}
-
-Agent Results:
-- RESEARCHER: {workflow_data.get('researcher', {}).get('status', 'N/A')} ({workflow_data.get('researcher', {}).get('num_sources', 0)} sources)
-- REVIEWER: {workflow_data.get('reviewer', {}).get('status', 'N/A')}
-- SYNTHESIZER: {workflow_data.get('synthesizer', {}).get('status', 'N/A')} ({len(workflow_data.get('synthesizer', {}).get('hypotheses', []))} hypotheses)
-- QUESTIONER: {workflow_data.get('questioner', {}).get('status', 'N/A')} ({len(workflow_data.get('questioner', {}).get('questions', []))} questions)
-- FORMATTER: {workflow_data.get('formatter', {}).get('status', 'N/A')}
-"""
-        return summary
+        researcher = workflow_data.researcher
+        synthesizer = workflow_data.synthesizer
+        questioner = workflow_data.questioner
+        
+        return _SUMMARY_TEMPLATE.format_map({
+            "query": workflow_data.query,
+            "status": workflow_data.status,
+            "researcher_status": researcher.status,
+            "num_sources": researcher.num_sources,
+            "reviewer_status": workflow_data.reviewer.status,
+            "synthesizer_status": synthesizer.status,
+            "num_hypotheses": len(synthesizer.hypotheses),
+            "questioner_status": questioner.status,
+            "num_questions": len(questioner.questions),
+            "formatter_status": workflow_data.formatter.status
+        })
     
-    def save_report(self, workflow_data: Dict, output_path: str = "research_report.txt"):
+    def save_report(
+        self,
+        workflow_data: WorkflowResult,
+        output_path: str = "research_report.txt",
+        save_json: bool = False
+    ):
         """
         Save the research report to a file.
         
         Args:
             workflow_data: Output from run_research_workflow
             output_path: Path to save the report
+            save_json: Whether to also save all workflow results next to the report
+                       (same path with a .json suffix)
         """
-        if workflow_data.get("status") != "success":
+        if workflow_data.status != "success":
             logger.warning("Cannot save report: workflow did not complete successfully")
             return
         
-        report = workflow_data.get("report", "")
+        report = workflow_data.report
         if not report:
             logger.warning("No report to save")
             return
         
+        parts = [
+            f"Research Query: {workflow_data.query}\n\n",
+            f"{_SEP70}\n\n",
+            report,
+            _SOURCES_HEADER
+        ]
+        for i, source in enumerate(workflow_data.researcher.sources, 1):
+            page = f"   Page: {source['page']}\n" if source.get('page') else ""
+            parts.append(f"{i}. {source.get('source', 'Unknown')}\n{page}\n")
+        # Encode once and write the whole report with as few syscalls as possible
+        payload = memoryview(_REPORT_HEADER + "".join(parts).encode('utf-8'))
+        
         try:
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write("="*70 + "\n")
-                f.write("RESEARCH REPORT\n")
-                f.write("="*70 + "\n\n")
-                f.write(f"Research Query: {workflow_data.get('query', 'N/A')}\n\n")
-                f.write("="*70 + "\n\n")
-                f.write(report)
-                f.write("\n\n" + "="*70 + "\n")
-                f.write("SOURCES\n")
-                f.write("="*70 + "\n\n")
-                sources = workflow_data.get('researcher', {}).get('sources', [])
-                for i, source in enumerate(sources, 1):
-                    f.write(f"{i}. {source.get('source', 'Unknown')}\n")
-                    if source.get('page'):
-                        f.write(f"   Page: {source['page']}\n")
-                    f.write("\n")
+            fd = os.open(output_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                while payload:
+                    payload = payload[os.write(fd, payload):]
+            finally:
+                os.close(fd)
             
             logger.info(f"Report saved to {output_path}")
             print(f"✓ Report saved to {output_path}")
+            
+            if save_json:
+                json_path = Path(output_path).with_suffix(".json")
+                json_path.write_bytes(_dumps_json(workflow_data.as_dict()))
+                logger.info(f"Workflow results saved to {json_path}")
+                print(f"✓ Workflow results saved to {json_path}")
         except Exception as e:
             logger.error(f"Error saving report: {str(e)}")
             print(f"❌ Error saving report: {str(e)}")
@@ -385,6 +828,16 @@ def main():
         default="research_report.txt",
         help="Output file path for report"
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Print the report while it is being generated"
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Also save all workflow results as JSON next to the report"
+    )
     parser.add_argument(
         "--no-save",
         action="store_true",
@@ -414,26 +867,29 @@ def main():
         sys.exit(1)
     
     # Run workflow
-    workflow_data = system.run_research_workflow(args.query, verbose=True)
+    on_report_token = None
+    if args.stream:
+        on_report_token = lambda text: print(text, end="", flush=True)
+    workflow_data = system.run_research_workflow(args.query, verbose=True, on_report_token=on_report_token)
     
     # Print summary
-    if workflow_data.get("status") == "success":
+    if workflow_data.status == "success":
         print(system.get_workflow_summary(workflow_data))
         
         # Print report
-        report = workflow_data.get("report", "")
-        if report:
-            print("\n" + "="*70)
+        report = workflow_data.report
+        if report and not args.stream:
+            print("\n" + _SEP70)
             print("RESEARCH REPORT")
-            print("="*70)
+            print(_SEP70)
             print(report)
-            print("="*70 + "\n")
+            print(_SEP70 + "\n")
         
         # Save report
         if not args.no_save:
-            system.save_report(workflow_data, args.output)
+            system.save_report(workflow_data, args.output, save_json=args.json)
     else:
-        print(f"\n❌ Workflow failed: {workflow_data.get('error', 'Unknown error')}\n")
+        print(f"\n❌ Workflow failed: {workflow_data.error or 'Unknown error'}\n")
         sys.exit(1)
 
 
@@ -5,24 +5,28 @@ Implements Retrieval-Augmented Generation for answering questions using document
 
 import os
 import sys
+import asyncio
 from pathlib import Path
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Union
 import logging
 from dotenv import load_dotenv
 
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import PromptTemplate
 from langchain_core.documents import Document
+from langchain_core.messages import HumanMessage
 
 # Handle both script execution and module import
 try:
     from .vector_store import VectorStore
+    from .llm_retry import RATE_LIMITER, retry_transient
 except ImportError:
     # For script execution
     import sys
     from pathlib import Path
     sys.path.append(str(Path(__file__).parent))
     from vector_store import VectorStore
+    from llm_retry import RATE_LIMITER, retry_transient
 
 load_dotenv()
 
@@ -93,11 +97,12 @@ class RAGPipeline:
             llm_model = "gemini-2.5-flash"
         
         # Initialize with LangChain wrapper (this is the working configuration)
+        # One attempt per request; retries are left to retry_transient (see llm_retry)
         self.llm = ChatGoogleGenerativeAI(
             model=llm_model,
             google_api_key=api_key,
             temperature=temperature,
-            convert_system_message_to_human=True
+            max_retries=1
         )
         
         # Store model information
@@ -163,65 +168,174 @@ Answer:"""
                 k=k
             )
             
-            if not retrieved_docs:
-                return {
-                    "answer": "I couldn't find any relevant documents to answer your question. Please make sure the vector store has been populated with documents.",
-                    "sources": [],
-                    "question": question
-                }
-            
-            # Step 2: Combine retrieved documents into context
-            context = "\n\n".join([
-                f"Document {i+1} (Source: {doc.metadata.get('source', 'Unknown')}):\n{doc.page_content}"
-                for i, doc in enumerate(retrieved_docs)
-            ])
-            
-            # Step 3: Create prompt with context and question
-            prompt_template = self._create_prompt_template()
-            prompt_text = prompt_template.format(context=context, question=question)
-            
-            # Step 4: Generate answer using LLM (LangChain wrapper)
-            logger.info("Generating answer using LLM...")
-            
-            # Use LangChain wrapper (only working method)
-            from langchain_core.messages import HumanMessage
-            messages = [HumanMessage(content=prompt_text)]
-            response = self.llm.invoke(messages)
-            
-            # Extract answer from response
-            if hasattr(response, 'content'):
-                answer = response.content
-            else:
-                answer = str(response)
-            
-            result = {
-                "answer": answer,
-                "question": question,
-                "num_sources": len(retrieved_docs)
-            }
-            
-            if return_sources:
-                result["sources"] = [
-                    {
-                        "source": doc.metadata.get("source", "Unknown"),
-                        "page": doc.metadata.get("page", None),
-                        "chunk_index": doc.metadata.get("chunk_index", None),
-                        "content_preview": doc.page_content[:200] + "..." if len(doc.page_content) > 200 else doc.page_content
-                    }
-                    for doc in retrieved_docs
-                ]
-            
-            logger.info("Answer generated successfully")
-            return result
+            return self._answer_from_documents(question, retrieved_docs, return_sources)
             
         except Exception as e:
             logger.error(f"Error answering question: {str(e)}")
-            return {
-                "answer": f"Error generating answer: {str(e)}",
-                "question": question,
-                "sources": [],
-                "error": str(e)
-            }
+            return self._error_result(question, e)
+    
+    async def abatch_answer_questions(
+        self,
+        questions: List[str],
+        k: Optional[Union[int, List[int]]] = None,
+        return_sources: bool = True
+    ) -> List[Dict]:
+        """
+        Answer several questions, retrieving documents for all of them at once.
+        
+        The questions are embedded in one request and searched with one vector
+        store lookup, which runs in a worker thread; the answers are then
+        generated concurrently on the event loop.
+        
+        Args:
+            questions: The questions to answer
+            k: Number of documents to retrieve, either one value for all questions
+               or one value per question (defaults to max_retrieval_docs)
+            return_sources: Whether to return source documents
+            
+        Returns:
+            List of answer dictionaries (same format as answer_question), in question order
+        """
+        if not questions:
+            return []
+        
+        if k is None:
+            k = self.max_retrieval_docs
+        ks = list(k) if isinstance(k, (list, tuple)) else [k] * len(questions)
+        
+        try:
+            # Step 1: Retrieve documents for every question in one batch
+            logger.info(f"Retrieving relevant documents for {len(questions)} questions...")
+            batch_docs = await asyncio.to_thread(
+                self.vector_store.similarity_search_batch,
+                queries=questions,
+                k=max(ks)
+            )
+        except Exception as e:
+            logger.error(f"Error answering questions: {str(e)}")
+            return [self._error_result(question, e) for question in questions]
+        
+        async def answer(index: int) -> Dict:
+            question = questions[index]
+            try:
+                return await self._aanswer_from_documents(question, batch_docs[index][:ks[index]], return_sources)
+            except Exception as e:
+                logger.error(f"Error answering question: {str(e)}")
+                return self._error_result(question, e)
+        
+        return await asyncio.gather(*(answer(index) for index in range(len(questions))))
+    
+    def _answer_from_documents(
+        self,
+        question: str,
+        retrieved_docs: List[Document],
+        return_sources: bool = True
+    ) -> Dict:
+        """
+        Generate an answer from already retrieved documents.
+        
+        Args:
+            question: The user's question
+            retrieved_docs: Documents retrieved for the question
+            return_sources: Whether to return source documents
+            
+        Returns:
+            Dictionary with answer and optionally source documents
+        """
+        if not retrieved_docs:
+            return self._no_documents_result(question)
+        
+        # Step 4: Generate answer using LLM (LangChain wrapper)
+        logger.info("Generating answer using LLM...")
+        answer = self._invoke_llm(self._answer_messages(question, retrieved_docs))
+        return self._answer_result(question, retrieved_docs, answer, return_sources)
+    
+    async def _aanswer_from_documents(
+        self,
+        question: str,
+        retrieved_docs: List[Document],
+        return_sources: bool = True
+    ) -> Dict:
+        """Asynchronous version of _answer_from_documents."""
+        if not retrieved_docs:
+            return self._no_documents_result(question)
+        
+        # Step 4: Generate answer using LLM (LangChain wrapper)
+        logger.info("Generating answer using LLM...")
+        answer = await self._ainvoke_llm(self._answer_messages(question, retrieved_docs))
+        return self._answer_result(question, retrieved_docs, answer, return_sources)
+    
+    @retry_transient
+    def _invoke_llm(self, messages: List[HumanMessage]) -> str:
+        """Send messages to the LLM within the request quota, retrying rate-limit and availability errors."""
+        RATE_LIMITER.wait()
+        return self.llm.invoke(messages).content
+    
+    @retry_transient
+    async def _ainvoke_llm(self, messages: List[HumanMessage]) -> str:
+        """Asynchronous version of _invoke_llm."""
+        await RATE_LIMITER.acquire()
+        return (await self.llm.ainvoke(messages)).content
+    
+    def _answer_messages(self, question: str, retrieved_docs: List[Document]) -> List[HumanMessage]:
+        """Build the LLM messages for answering a question from retrieved documents."""
+        # Step 2: Combine retrieved documents into context
+        context = "\n\n".join([
+            f"Document {i+1} (Source: {doc.metadata.get('source', 'Unknown')}):\n{doc.page_content}"
+            for i, doc in enumerate(retrieved_docs)
+        ])
+        
+        # Step 3: Create prompt with context and question
+        prompt_template = self._create_prompt_template()
+        prompt_text = prompt_template.format(context=context, question=question)
+        
+        # Use LangChain wrapper (only working method)
+        return [HumanMessage(content=prompt_text)]
+    
+    def _no_documents_result(self, question: str) -> Dict:
+        """Build the result returned when no documents were retrieved."""
+        return {
+            "answer": "I couldn't find any relevant documents to answer your question. Please make sure the vector store has been populated with documents.",
+            "sources": [],
+            "question": question
+        }
+    
+    def _answer_result(
+        self,
+        question: str,
+        retrieved_docs: List[Document],
+        answer: str,
+        return_sources: bool = True
+    ) -> Dict:
+        """Build the result dictionary for a generated answer."""
+        result = {
+            "answer": answer,
+            "question": question,
+            "num_sources": len(retrieved_docs)
+        }
+        
+        if return_sources:
+            result["sources"] = [
+                {
+                    "source": doc.metadata.get("source", "Unknown"),
+                    "page": doc.metadata.get("page", None),
+                    "chunk_index": doc.metadata.get("chunk_index", None),
+                    "content_preview": doc.page_content[:200] + "..." if len(doc.page_content) > 200 else doc.page_content
+                }
+                for doc in retrieved_docs
+            ]
+        
+        logger.info("Answer generated successfully")
+        return result
+    
+    def _error_result(self, question: str, error: Exception) -> Dict:
+        """Build the result returned when answering a question fails."""
+        return {
+            "answer": f"Error generating answer: {str(error)}",
+            "question": question,
+            "sources": [],
+            "error": str(error)
+        }
     
     def get_vector_store_stats(self) -> Dict:
         """Get statistics about the vector store."""
@@ -0,0 +1,101 @@
+"""
+Agent Results Module
+Typed results of the research agents and of a complete workflow.
+
+Kept free of LangChain and Gemini imports so results can be created,
+inspected and serialized without loading the agents.
+"""
+
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+@dataclass(slots=True)
+class AgentResult:
+    """Output of an agent; subclasses add the agent-specific fields."""
+    agent: str
+    status: str
+    message: str = ""
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Convert to a plain dictionary (e.g. for JSON serialization)."""
+        return asdict(self)
+
+
+@dataclass(slots=True)
+class ResearcherResult(AgentResult):
+    """Output of the RESEARCHER agent."""
+    analysis: str = ""
+    findings: List[str] = field(default_factory=list)
+    sources: List[Dict] = field(default_factory=list)
+    num_sources: int = 0
+
+
+@dataclass(slots=True)
+class ReviewerResult(AgentResult):
+    """Output of the REVIEWER agent."""
+    critique: str = ""
+    researcher_analysis: str = ""
+    strengths: List[str] = field(default_factory=list)
+    weaknesses: List[str] = field(default_factory=list)
+    sources: List[Dict] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class SynthesizerResult(AgentResult):
+    """Output of the SYNTHESIZER agent."""
+    synthesis: str = ""
+    hypotheses: List[str] = field(default_factory=list)
+    insights: List[str] = field(default_factory=list)
+    researcher_analysis: str = ""
+    critique: str = ""
+
+
+@dataclass(slots=True)
+class QuestionerResult(AgentResult):
+    """Output of the QUESTIONER agent."""
+    gap_analysis: str = ""
+    gaps: List[str] = field(default_factory=list)
+    questions: List[str] = field(default_factory=list)
+    synthesis: str = ""
+    hypotheses: List[str] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class FormatterResult(AgentResult):
+    """Output of the FORMATTER agent."""
+    report: str = ""
+    query: str = ""
+    researcher: Optional[ResearcherResult] = None
+    reviewer: Optional[ReviewerResult] = None
+    synthesizer: Optional[SynthesizerResult] = None
+    questioner: Optional[QuestionerResult] = None
+    sources: List[Dict] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class WorkflowStep:
+    """One completed step of a research workflow."""
+    step: int
+    agent: str
+    status: str
+
+
+@dataclass(slots=True)
+class WorkflowResult:
+    """Output of a research workflow: the result of every agent that ran."""
+    query: str
+    workflow: List[WorkflowStep] = field(default_factory=list)
+    researcher: Optional[ResearcherResult] = None
+    reviewer: Optional[ReviewerResult] = None
+    synthesizer: Optional[SynthesizerResult] = None
+    questioner: Optional[QuestionerResult] = None
+    formatter: Optional[FormatterResult] = None
+    status: str = "in_progress"
+    error: Optional[str] = None
+    report: str = ""
+    cached_from: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Convert to a plain dictionary (e.g. for JSON serialization)."""
+        return asdict(self)
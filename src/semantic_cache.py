@@ -0,0 +1,202 @@
+"""
+Semantic Cache Module
+Finds results stored for earlier, semantically similar queries using
+random-projection locality-sensitive hashing (LSH) over query embeddings.
+"""
+
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def quantize_int8(vector: np.ndarray) -> Tuple[np.ndarray, np.float16]:
+    """
+    Quantize a vector to int8 with a per-vector scale (4x smaller than float32).
+
+    Args:
+        vector: Float vector
+
+    Returns:
+        Tuple of (int8 vector, float16 scale)
+    """
+    scale = float(np.max(np.abs(vector))) / 127 or 1.0
+    return np.round(vector / scale).astype(np.int8), np.float16(scale)
+
+
+def dequantize_int8(quantized: np.ndarray, scales) -> np.ndarray:
+    """
+    Reconstruct float32 vectors from quantize_int8 output.
+
+    Args:
+        quantized: int8 vector, or stacked int8 vectors
+        scales: Scale of the vector, or one scale per stacked vector
+
+    Returns:
+        float32 vector(s)
+    """
+    scales = np.asarray(scales, dtype=np.float32)
+    if quantized.ndim > 1:
+        scales = scales[:, None]
+    return quantized.astype(np.float32) * scales
+
+
+class SemanticLSHCache:
+    """
+    Cache keyed by embedding vectors, returning the value stored for the most
+    similar vector above a cosine similarity threshold.
+
+    Each of n_tables hash tables buckets vectors by the signs of their
+    projections onto n_bits random hyperplanes. Similar vectors share a bucket
+    in at least one table with high probability, so a lookup only compares
+    against the vectors in its buckets instead of every cached vector.
+
+    Vectors are stored quantized to int8 and reconstructed only for the
+    candidates of a lookup.
+    """
+
+    def __init__(
+        self,
+        dim: Optional[int] = None,
+        n_tables: int = 8,
+        n_bits: int = 16,
+        threshold: float = 0.93,
+        max_entries: int = 256,
+        seed: int = 0
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            dim: Embedding dimension (inferred from the first vector if None)
+            n_tables: Number of hash tables (more tables find more near neighbours)
+            n_bits: Hyperplanes per table, at most 64 (more bits make buckets more selective)
+            threshold: Minimum cosine similarity for a hit
+            max_entries: Maximum number of cached values (least recently used are evicted)
+            seed: Seed for the random hyperplanes
+        """
+        if not 0 < n_bits <= 64:
+            raise ValueError("n_bits must be between 1 and 64")
+
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._rng = np.random.default_rng(seed)
+        self._planes: Optional[np.ndarray] = None
+        self._bit_weights = np.left_shift(np.uint64(1), np.arange(n_bits, dtype=np.uint64))
+
+        # One {hash: [entry id, ...]} bucket map per table
+        self._tables: List[Dict[int, List[int]]] = [{} for _ in range(n_tables)]
+        # entry id -> (int8 normalized vector, scale, hashes, value)
+        self._entries: "OrderedDict[int, Tuple[np.ndarray, np.float16, Tuple[int, ...], Any]]" = OrderedDict()
+        self._next_id = 0
+
+        if dim is not None:
+            self._init_planes(dim)
+
+    def _init_planes(self, dim: int):
+        """Draw the random hyperplanes for every table."""
+        self._planes = self._rng.standard_normal((dim, self.n_tables * self.n_bits)).astype(np.float32)
+
+    def _normalize(self, vector) -> np.ndarray:
+        """Convert to a unit-length float32 vector."""
+        vector = np.asarray(vector, dtype=np.float32)
+        if self._planes is None:
+            self._init_planes(vector.shape[0])
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _hashes(self, vector: np.ndarray) -> Tuple[int, ...]:
+        """Per-table hash: the projection sign bits packed into an integer."""
+        bits = (vector @ self._planes > 0).reshape(self.n_tables, self.n_bits)
+        return tuple(int(h) for h in bits.astype(np.uint64) @ self._bit_weights)
+
+    def get(self, vector, threshold: Optional[float] = None) -> Optional[Any]:
+        """
+        Look up the value stored for the most similar vector.
+
+        The hash tables are tuned for the cache's own threshold; a lookup with a
+        lower threshold would miss most of its matches there, so it compares
+        against every cached vector instead.
+
+        Args:
+            vector: Query embedding
+            threshold: Minimum cosine similarity for this lookup (defaults to the cache's)
+
+        Returns:
+            Cached value, or None if no cached vector is similar enough
+        """
+        if not self._entries:
+            return None
+        if threshold is None:
+            threshold = self.threshold
+
+        vector = self._normalize(vector)
+        if threshold < self.threshold:
+            ids = list(self._entries)
+        else:
+            candidates = set()
+            for table, key in zip(self._tables, self._hashes(vector)):
+                candidates.update(table.get(key, ()))
+            if not candidates:
+                return None
+            ids = list(candidates)
+
+        entries = [self._entries[entry_id] for entry_id in ids]
+        candidate_vectors = dequantize_int8(
+            np.stack([entry[0] for entry in entries]),
+            [entry[1] for entry in entries]
+        )
+        scores = candidate_vectors @ vector
+        best = int(np.argmax(scores))
+        if scores[best] < threshold:
+            return None
+
+        self._entries.move_to_end(ids[best])
+        return entries[best][3]
+
+    def put(self, vector, value: Any):
+        """
+        Store a value under an embedding.
+
+        Args:
+            vector: Embedding to key the value on
+            value: Value to cache
+        """
+        vector = self._normalize(vector)
+        hashes = self._hashes(vector)
+
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = (*quantize_int8(vector), hashes, value)
+        for table, key in zip(self._tables, hashes):
+            table.setdefault(key, []).append(entry_id)
+
+        while len(self._entries) > self.max_entries:
+            self._evict_oldest()
+
+    def _evict_oldest(self):
+        """Remove the least recently used entry from the entries and its buckets."""
+        entry_id, (_, _, hashes, _) = self._entries.popitem(last=False)
+        for table, key in zip(self._tables, hashes):
+            bucket = table[key]
+            bucket.remove(entry_id)
+            if not bucket:
+                del table[key]
+
+    def clear(self):
+        """Remove all cached values."""
+        self._entries.clear()
+        for table in self._tables:
+            table.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
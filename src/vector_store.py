@@ -4,6 +4,7 @@ Manages the ChromaDB vector database for storing document embeddings.
 """
 
 import os
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Optional
 import chromadb
@@ -17,12 +18,40 @@ except ImportError:
 import logging
 from dotenv import load_dotenv
 
+# Handle both script execution and module import
+try:
+    from .embedding_cache import CachedEmbeddings, MicroBatchEmbeddings
+except ImportError:
+    # For script execution
+    import sys
+    sys.path.append(str(Path(__file__).parent))
+    from embedding_cache import CachedEmbeddings, MicroBatchEmbeddings
+
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=None)
+def _get_chroma_client(persist_directory: str) -> "chromadb.api.ClientAPI":
+    """
+    ChromaDB client for a directory, shared by every VectorStore that uses it.
+    
+    Telemetry is disabled so the client makes no analytics requests.
+    
+    Args:
+        persist_directory: Resolved path of the database directory
+        
+    Returns:
+        Persistent ChromaDB client
+    """
+    return chromadb.PersistentClient(
+        path=persist_directory,
+        settings=Settings(anonymized_telemetry=False)
+    )
+
+
 class VectorStore:
     """
     Manages document embeddings in ChromaDB vector database.
@@ -70,10 +99,16 @@ class VectorStore:
                 "Get your API key from: https://makersuite.google.com/app/apikey"
             )
         
-        # Initialize Google Gemini embeddings
-        self.embeddings = GoogleGenerativeAIEmbeddings(
-            model=embedding_model,
-            google_api_key=api_key
+        # Initialize Google Gemini embeddings; query embeddings are cached so
+        # repeated queries (across agents and workflow runs) are embedded once,
+        # and concurrent async query embeddings share one request
+        self.embeddings = MicroBatchEmbeddings(
+            CachedEmbeddings(
+                GoogleGenerativeAIEmbeddings(
+                    model=embedding_model,
+                    google_api_key=api_key
+                )
+            )
         )
         
         # Initialize ChromaDB
@@ -89,18 +124,16 @@ class VectorStore:
             # Check if vector store already exists
             if self._vector_store_exists():
                 logger.info(f"Loading existing vector store from {self.persist_directory}")
-                self.vector_store = Chroma(
-                    persist_directory=str(self.persist_directory),
-                    embedding_function=self.embeddings,
-                    collection_name=self.collection_name
-                )
             else:
                 logger.info(f"Creating new vector store at {self.persist_directory}")
-                self.vector_store = Chroma(
-                    persist_directory=str(self.persist_directory),
-                    embedding_function=self.embeddings,
-                    collection_name=self.collection_name
-                )
+            
+            # One client per directory, shared with other VectorStores (e.g. the
+            # document processor's), so the database is opened only once
+            self.vector_store = Chroma(
+                client=_get_chroma_client(str(self.persist_directory.resolve())),
+                embedding_function=self.embeddings,
+                collection_name=self.collection_name
+            )
             
             logger.info("Vector store initialized successfully")
             
@@ -181,6 +214,53 @@ class VectorStore:
             logger.error(f"Error in similarity search: {str(e)}")
             raise
     
+    def similarity_search_batch(
+        self,
+        queries: List[str],
+        k: int = 4,
+        filter: Optional[dict] = None
+    ) -> List[List[Document]]:
+        """
+        Search for similar documents for several queries at once.
+        
+        All queries are embedded in a single request and searched with a single
+        multi-query ChromaDB lookup, instead of one round-trip per query.
+        
+        Args:
+            queries: Search queries
+            k: Number of results to return per query
+            filter: Optional metadata filter
+            
+        Returns:
+            List of similar Document lists, one per query (in query order)
+        """
+        if not queries:
+            return []
+        
+        try:
+            query_embeddings = self.embeddings.embed_documents(queries, task_type="RETRIEVAL_QUERY")
+            results = self.vector_store._collection.query(
+                query_embeddings=query_embeddings,
+                n_results=k,
+                where=filter,
+                include=["documents", "metadatas"]
+            )
+            
+            batch = [
+                [
+                    Document(page_content=content, metadata=metadata or {})
+                    for content, metadata in zip(contents, metadatas)
+                ]
+                for contents, metadatas in zip(results["documents"], results["metadatas"])
+            ]
+            
+            logger.info(f"Found similar documents for {len(queries)} queries in one batch")
+            return batch
+            
+        except Exception as e:
+            logger.error(f"Error in batch similarity search: {str(e)}")
+            raise
+    
     def similarity_search_with_score(
         self,
         query: str,
@@ -229,11 +309,11 @@ class VectorStore:
     def delete_collection(self):
         """Delete the entire collection (use with caution)."""
         try:
-            import shutil
-            if self.persist_directory.exists():
-                shutil.rmtree(self.persist_directory)
-                logger.warning(f"Deleted vector store at {self.persist_directory}")
-                self._initialize_vector_store()
+            # Deleted through the shared client rather than by removing the
+            # directory, which would pull the database out from under it
+            self.vector_store.delete_collection()
+            logger.warning(f"Deleted collection {self.collection_name} from {self.persist_directory}")
+            self._initialize_vector_store()
         except Exception as e:
             logger.error(f"Error deleting collection: {str(e)}")
             raise